@@ -8,12 +8,11 @@ from .opencode import OpenCodeProvider
 
 def get_available_providers() -> list[ChatProvider]:
     """Auto-detect which IDEs are installed and return their providers."""
-    providers = []
-    for ProviderClass in [CursorProvider, ClaudeCodeProvider, OpenCodeProvider]:
-        try:
-            provider = ProviderClass()
-            if provider.is_available():
-                providers.append(provider)
-        except Exception:
-            continue
-    return providers
+    return [
+        provider
+        for provider in (
+            ProviderClass.probe()
+            for ProviderClass in (CursorProvider, ClaudeCodeProvider, OpenCodeProvider)
+        )
+        if provider is not None
+    ]
@@ -14,37 +14,79 @@ JSONL entry types:
 
 import json
 import logging
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from functools import cache, lru_cache
 from pathlib import Path
+from typing import BinaryIO
 
 from ..config import get_claude_code_path
 from ..core import Message, Session, Workspace
 from ..provider import ChatProvider
 
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # orjson is an optional speedup
+    _loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+_READ_CHUNK = 1 << 20
+# Only settled session files at least this large are mapped; see _parse_jsonl.
+_MMAP_MIN_SIZE = 1 << 20
+_MMAP_SETTLE_SECONDS = 10.0
+# Seconds a detected base path and availability check stay valid, so a
+# projects directory created after startup is picked up without a restart.
+_AVAILABILITY_TTL = 30.0
+_USER_TYPES = frozenset({"human", "user"})
+_DASH_TO_SLASH = str.maketrans("-", "/")
+
 
 class ClaudeCodeProvider(ChatProvider):
     """Provider for Claude Code chat history."""
 
     name = "claude_code"
 
+    def __init__(self, base_path: Path | None = None) -> None:
+        # Overrides the detected projects directory when given
+        self._base_path = base_path
+        # (monotonic time checked, base path, whether it is a directory)
+        self._base_state: tuple[float, Path, bool] | None = None
+        # Project dir -> (index (mtime_ns, size) or None, display path)
+        self._display_paths: dict[str, tuple[tuple[int, int] | None, str]] = {}
+        self._entry_handlers = {
+            "human": self._parse_user_entry,
+            "user": self._parse_user_entry,
+            "assistant": self._parse_assistant_entry,
+        }
+
+    def _checked_base(self) -> tuple[float, Path, bool]:
+        """Return the cached base path check, redoing it once it expires."""
+        state = self._base_state
+        now = time.monotonic()
+        if state is None or now - state[0] > _AVAILABILITY_TTL:
+            base = self._base_path if self._base_path is not None else get_claude_code_path()
+            state = self._base_state = (now, base, base.is_dir())
+        return state
+
     def get_base_path(self) -> Path:
-        return get_claude_code_path()
+        return self._checked_base()[1]
 
     def is_available(self) -> bool:
-        return self.get_base_path().is_dir()
+        return self._checked_base()[2]
 
     def list_workspaces(self) -> list[Workspace]:
-        base = self.get_base_path()
-        if not base.is_dir():
+        if not self.is_available():
             return []
+        base = self.get_base_path()
 
         workspaces = []
-        for project_dir in base.iterdir():
-            if not project_dir.is_dir():
-                continue
-
+        for project_dir in _iter_subdirs(base):
             display_path = self._resolve_display_path(project_dir)
             workspaces.append(Workspace(
                 id=project_dir.name,
@@ -55,24 +97,30 @@ class ClaudeCodeProvider(ChatProvider):
         return workspaces
 
     def list_sessions(self, workspace_id: str | None = None) -> list[Session]:
-        base = self.get_base_path()
-        if not base.is_dir():
+        if not self.is_available():
             return []
-
-        sessions = []
+        base = self.get_base_path()
 
         if workspace_id:
-            project_dirs = [base / workspace_id]
-        else:
-            project_dirs = [d for d in base.iterdir() if d.is_dir()]
-
-        for project_dir in project_dirs:
+            project_dir = base / workspace_id
             if not project_dir.is_dir():
-                continue
-            sessions.extend(self._read_project_sessions(project_dir))
+                return []
+            return self._read_project_sessions(project_dir)
 
+        # Project indexes are independent files; read them concurrently so
+        # JSON decoding of one overlaps with disk reads of the others.
+        sessions = []
+        for result in _io_pool().map(self._read_project_sessions, _iter_subdirs(base)):
+            sessions.extend(result)
         return sessions
 
+    def data_version(self) -> tuple | None:
+        """Stat each project's index, or its JSONL files when it has none."""
+        if not self.is_available():
+            return None
+        base = self.get_base_path()
+        return (str(base), tuple(_project_version(d) for d in _iter_subdirs(base)))
+
     def get_session_messages(self, session_id: str) -> list[Message]:
         """Get messages for a session.
 
@@ -86,52 +134,70 @@ class ClaudeCodeProvider(ChatProvider):
         session_uuid = parts[2]
 
         jsonl_path = self.get_base_path() / project_name / f"{session_uuid}.jsonl"
-        if not jsonl_path.exists():
-            return []
-
         return self._parse_jsonl(jsonl_path)
 
+    def session_version(self, session_id: str) -> tuple | None:
+        """Stat the session's JSONL file."""
+        parts = session_id.split(":", 2)
+        if len(parts) < 3 or parts[0] != "claude":
+            return None
+        jsonl_path = self.get_base_path() / parts[1] / f"{parts[2]}.jsonl"
+        try:
+            st = os.stat(jsonl_path)
+        except OSError:
+            return None
+        return (str(jsonl_path), st.st_mtime_ns, st.st_size)
+
     # ── Private helpers ──────────────────────────────────────────────
 
-    def _resolve_display_path(self, project_dir: Path) -> str:
+    def _resolve_display_path(self, project_dir: Path, index_data=None) -> str:
         """Resolve the display path for a project directory.
 
         First checks sessions-index.json for projectPath,
         then falls back to deriving from directory name.
+        index_data, when given, is the already decoded index and always
+        wins. Otherwise results are cached per directory until its index
+        changes or appears.
         """
+        if index_data is not None:
+            return _display_path_from(project_dir, index_data)
+
         index_path = project_dir / "sessions-index.json"
-        if index_path.exists():
+        try:
+            st = os.stat(index_path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        key = str(project_dir)
+        cached = self._display_paths.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        if stamp is not None:
             try:
-                data = json.loads(index_path.read_text(encoding="utf-8"))
-                if isinstance(data, list) and data:
-                    path = data[0].get("projectPath")
-                    if path:
-                        return path
-            except (json.JSONDecodeError, OSError):
+                index_data = _loads(index_path.read_bytes())
+            except (ValueError, OSError):
                 pass
-
-        # Derive from folder name: -Users-farhaj-dev-foo -> /Users/farhaj/dev/foo
-        name = project_dir.name
-        if name.startswith("-"):
-            return name.replace("-", "/")
-        return name
+        display_path = _display_path_from(project_dir, index_data)
+        self._display_paths[key] = (stamp, display_path)
+        return display_path
 
     def _read_project_sessions(self, project_dir: Path) -> list[Session]:
         """Read sessions from a project's sessions-index.json."""
-        index_path = project_dir / "sessions-index.json"
-        if not index_path.exists():
-            return self._scan_jsonl_sessions(project_dir)
-
+        # Open the index directly rather than stat-ing it first: a missing
+        # index costs one failed open instead of an exists() plus a read.
         try:
-            data = json.loads(index_path.read_text(encoding="utf-8"))
-        except (json.JSONDecodeError, OSError) as e:
+            data = _loads((project_dir / "sessions-index.json").read_bytes())
+        except FileNotFoundError:
+            return self._scan_jsonl_sessions(project_dir)
+        except (ValueError, OSError) as e:
             logger.warning("Failed to read sessions-index.json in %s: %s", project_dir, e)
             return []
 
         if not isinstance(data, list):
             return []
 
-        display_path = self._resolve_display_path(project_dir)
+        display_path = self._resolve_display_path(project_dir, data)
         sessions = []
 
         for entry in data:
@@ -168,28 +234,18 @@ class ClaudeCodeProvider(ChatProvider):
         sessions = []
         display_path = self._resolve_display_path(project_dir)
 
-        for jsonl_file in project_dir.glob("*.jsonl"):
+        with os.scandir(project_dir) as it:
+            jsonl_files = [
+                Path(entry.path) for entry in it
+                if entry.name.endswith(".jsonl") and entry.is_file()
+            ]
+
+        for jsonl_file in jsonl_files:
             session_id = jsonl_file.stem
             try:
-                line_count = sum(1 for _ in jsonl_file.open(encoding="utf-8"))
+                title, line_count = self._scan_jsonl_file(jsonl_file)
             except OSError:
-                line_count = 0
-
-            title = "Untitled"
-            try:
-                with jsonl_file.open(encoding="utf-8") as f:
-                    for raw_line in f:
-                        raw_line = raw_line.strip()
-                        if not raw_line:
-                            continue
-                        entry = json.loads(raw_line)
-                        if entry.get("type") in ("human", "user"):
-                            text = self._extract_user_text(entry)
-                            if text:
-                                title = text[:80]
-                                break
-            except (json.JSONDecodeError, OSError):
-                pass
+                title, line_count = "Untitled", 0
 
             sessions.append(Session(
                 id=f"claude:{project_dir.name}:{session_id}",
@@ -202,29 +258,91 @@ class ClaudeCodeProvider(ChatProvider):
 
         return sessions
 
+    def _scan_jsonl_file(self, path: Path) -> tuple[str, int]:
+        """Return (title, line_count) for a JSONL file in a single pass.
+
+        Lines are decoded only until the first user prompt is found; the
+        rest of the file is just counted.
+        """
+        title = "Untitled"
+        line_count = 0
+        with path.open("rb") as f:
+            for raw_line in f:
+                line_count += 1
+                if raw_line.isspace():
+                    continue
+                try:
+                    entry = _loads(raw_line)
+                except ValueError:  # bad JSON, or invalid UTF-8 under json.loads
+                    break
+                if entry.get("type") in _USER_TYPES:
+                    text = self._first_user_text(entry)
+                    if text:
+                        title = text
+                        break
+            line_count += _count_lines(f)
+        return title, line_count
+
     def _parse_jsonl(self, path: Path) -> list[Message]:
         """Parse a session's JSONL file into messages.
 
         Each JSONL line can produce zero, one, or multiple Message objects.
         """
-        messages = []
-
         try:
-            with path.open(encoding="utf-8") as f:
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        entry = json.loads(line)
-                    except json.JSONDecodeError as e:
-                        logger.debug("Bad JSON at %s:%d: %s", path, line_num, e)
-                        continue
-
-                    messages.extend(self._entry_to_messages(entry))
+            with path.open("rb") as f:
+                st = os.fstat(f.fileno())
+                if st.st_size == 0:
+                    return []
+                # Small files and sessions that may still be written to are
+                # read into memory: truncating a mapped file raises SIGBUS.
+                if st.st_size < _MMAP_MIN_SIZE or time.time() - st.st_mtime < _MMAP_SETTLE_SECONDS:
+                    return self._parse_jsonl_buffer(path, f.read())
+                try:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (ValueError, OSError):
+                    # Truncated to empty since fstat(), or not mappable
+                    return self._parse_jsonl_buffer(path, f.read())
+                # Slice lines straight out of the page cache instead of going
+                # through the buffered line iterator.
+                with mm:
+                    return self._parse_jsonl_buffer(path, mm)
+        except FileNotFoundError:
+            return []
         except OSError as e:
             logger.warning("Failed to read JSONL %s: %s", path, e)
+            return []
 
+    def _parse_jsonl_buffer(self, path: Path, buf: bytes | mmap.mmap) -> list[Message]:
+        """Parse JSONL lines from an in-memory or mapped buffer."""
+        messages: list[Message] = []
+        # Bind per-line lookups to locals; this loop runs once per
+        # JSONL line and dominates parsing of long sessions.
+        find = buf.find
+        loads = _loads
+        to_messages = self._entry_to_messages
+        extend = messages.extend
+        size = len(buf)
+        start = 0
+        line_num = 0
+        while start < size:
+            end = find(b"\n", start)
+            if end == -1:
+                end = size
+            line_num += 1
+            line = buf[start:end]
+            start = end + 1
+            # The JSON decoders skip surrounding whitespace (a trailing \r
+            # included), so only blank lines need filtering; no stripped
+            # copy is made.
+            if not line or line.isspace():
+                continue
+            try:
+                entry = loads(line)
+            except ValueError as e:  # bad JSON, or invalid UTF-8 under json.loads
+                logger.debug("Bad JSON at %s:%d: %s", path, line_num, e)
+                continue
+
+            extend(to_messages(entry))
         return messages
 
     def _entry_to_messages(self, entry: dict) -> list[Message]:
@@ -233,23 +351,12 @@ class ClaudeCodeProvider(ChatProvider):
         Returns an empty list for entries that should be skipped.
         A single entry can produce multiple messages (e.g. assistant text + tool calls).
         """
-        entry_type = entry.get("type", "")
-        timestamp = _parse_iso(entry.get("timestamp"))
-
-        # Skip non-message entry types
-        if entry_type in (
-            "file-history-snapshot", "progress", "system",
-            "summary", "queue-operation",
-        ):
+        handler = self._entry_handlers.get(entry.get("type", ""))
+        if handler is None:
+            # file-history-snapshot, progress, system, summary,
+            # queue-operation and unknown types carry no messages
             return []
-
-        if entry_type in ("human", "user"):
-            return self._parse_user_entry(entry, timestamp)
-
-        if entry_type == "assistant":
-            return self._parse_assistant_entry(entry, timestamp)
-
-        return []
+        return handler(entry, _parse_iso(entry.get("timestamp")))
 
     def _parse_user_entry(self, entry: dict, timestamp: datetime | None) -> list[Message]:
         """Parse a user/human JSONL entry.
@@ -264,7 +371,7 @@ class ClaudeCodeProvider(ChatProvider):
 
         # Simple string content
         if isinstance(content, str):
-            if content.strip():
+            if content and not content.isspace():
                 return [Message(
                     role="user",
                     content=content,
@@ -278,7 +385,7 @@ class ClaudeCodeProvider(ChatProvider):
 
         for block in content:
             if not isinstance(block, dict):
-                if isinstance(block, str) and block.strip():
+                if isinstance(block, str) and block and not block.isspace():
                     text_parts.append(block)
                 continue
 
@@ -286,30 +393,22 @@ class ClaudeCodeProvider(ChatProvider):
 
             if block_type == "text":
                 text = block.get("text", "")
-                if text.strip():
+                if text and not text.isspace():
                     text_parts.append(text)
 
             elif block_type == "tool_result":
                 # Tool execution result — show as tool message
                 tool_content = block.get("content", "")
                 if isinstance(tool_content, list):
-                    # Content can be array of blocks (text, image, etc.)
-                    parts = []
-                    for sub in tool_content:
-                        if isinstance(sub, dict):
-                            sub_type = sub.get("type", "")
-                            if sub_type == "text":
-                                parts.append(sub.get("text", ""))
-                            elif sub_type == "image":
-                                parts.append("[Image]")
-                            else:
-                                # Unknown block type — try text field
-                                text = sub.get("text", "")
-                                if text:
-                                    parts.append(text)
-                        elif isinstance(sub, str):
-                            parts.append(sub)
-                    tool_content = "\n".join(parts)
+                    # Content can be array of blocks (text, image, etc.);
+                    # a single block is by far the most common shape.
+                    if len(tool_content) == 1:
+                        tool_content = _tool_block_text(tool_content[0]) or ""
+                    else:
+                        tool_content = "\n".join(
+                            part for part in map(_tool_block_text, tool_content)
+                            if part is not None
+                        )
 
                 is_error = block.get("is_error", False)
                 messages.append(Message(
@@ -324,7 +423,7 @@ class ClaudeCodeProvider(ChatProvider):
         if text_parts:
             messages.insert(0, Message(
                 role="user",
-                content="\n".join(text_parts),
+                content=_join_lines(text_parts),
                 timestamp=timestamp,
                 message_type="text",
             ))
@@ -341,7 +440,7 @@ class ClaudeCodeProvider(ChatProvider):
         content_blocks = msg_data.get("content", [])
 
         if isinstance(content_blocks, str):
-            if content_blocks.strip():
+            if content_blocks and not content_blocks.isspace():
                 return [Message(
                     role="assistant",
                     content=content_blocks,
@@ -361,7 +460,7 @@ class ClaudeCodeProvider(ChatProvider):
 
             if block_type == "text":
                 text = block.get("text", "")
-                if text.strip():
+                if text and not text.isspace():
                     text_parts.append(text)
 
             elif block_type == "tool_use":
@@ -394,7 +493,7 @@ class ClaudeCodeProvider(ChatProvider):
 
             elif block_type == "thinking":
                 text = block.get("thinking", "")
-                if text.strip():
+                if text and not text.isspace():
                     messages.append(Message(
                         role="thinking",
                         content=text,
@@ -406,36 +505,137 @@ class ClaudeCodeProvider(ChatProvider):
         if text_parts:
             messages.insert(0, Message(
                 role="assistant",
-                content="\n".join(text_parts),
+                content=_join_lines(text_parts),
                 timestamp=timestamp,
                 message_type="text",
             ))
 
         return messages
 
-    def _extract_user_text(self, entry: dict) -> str:
-        """Extract plain text content from a user entry (ignoring tool_results)."""
+    def _first_user_text(self, entry: dict, limit: int = 80) -> str:
+        """Return the first non-empty text of a user entry, truncated to limit.
+
+        Used for titles, so it stops at the first text block instead of
+        joining them all; tool_result blocks are ignored.
+        """
         msg_data = entry.get("message", {})
         content = msg_data.get("content", [])
         if isinstance(content, str):
-            return content
+            return content[:limit]
 
-        parts = []
         for block in content:
-            if isinstance(block, dict) and block.get("type") == "text":
-                parts.append(block.get("text", ""))
+            if isinstance(block, dict):
+                if block.get("type") != "text":
+                    continue
+                text = block.get("text", "")
             elif isinstance(block, str):
-                parts.append(block)
-        return "\n".join(parts)
+                text = block
+            else:
+                continue
+            if text:
+                return text[:limit]
+        return ""
+
+
+def _project_version(project_dir: Path) -> tuple:
+    """Return a change token for the sessions listed from one project dir."""
+    try:
+        st = os.stat(project_dir / "sessions-index.json")
+    except FileNotFoundError:
+        # No index: the listing comes from the JSONL files themselves
+        with os.scandir(project_dir) as it:
+            files = []
+            for entry in it:
+                if entry.name.endswith(".jsonl") and entry.is_file():
+                    est = entry.stat()
+                    files.append((entry.name, est.st_mtime_ns, est.st_size))
+        return (project_dir.name, None, tuple(sorted(files)))
+    return (project_dir.name, st.st_mtime_ns, st.st_size)
+
+
+@cache
+def _io_pool() -> ThreadPoolExecutor:
+    """Return the shared thread pool used for per-project reads."""
+    return ThreadPoolExecutor(
+        max_workers=min(32, (os.cpu_count() or 1) * 4),
+        thread_name_prefix="claude-code",
+    )
+
+
+def _tool_block_text(sub) -> str | None:
+    """Render one tool_result content block, or None if it has no text."""
+    if isinstance(sub, dict):
+        sub_type = sub.get("type", "")
+        if sub_type == "text":
+            return sub.get("text", "")
+        if sub_type == "image":
+            return "[Image]"
+        # Unknown block type — try text field
+        return sub.get("text", "") or None
+    if isinstance(sub, str):
+        return sub
+    return None
+
+
+def _join_lines(parts: list[str]) -> str:
+    """Join text parts with newlines, skipping the join for a single part."""
+    return parts[0] if len(parts) == 1 else "\n".join(parts)
+
+
+def _count_lines(f: BinaryIO) -> int:
+    """Count the lines left in a binary file object without decoding them.
+
+    Matches iterating the file line by line: a trailing line without a
+    final newline still counts.
+    """
+    count = 0
+    ends_with_newline = True
+    buf = bytearray(_READ_CHUNK)
+    while n := f.readinto(buf):
+        count += buf.count(b"\n", 0, n)
+        ends_with_newline = buf[n - 1] == 0x0A
+    if not ends_with_newline:
+        count += 1
+    return count
+
+
+def _iter_subdirs(base: Path) -> list[Path]:
+    """List the immediate subdirectories of base.
+
+    Uses os.scandir so the entry type comes from the directory listing
+    itself instead of a separate stat() per entry.
+    """
+    with os.scandir(base) as it:
+        return [Path(entry.path) for entry in it if entry.is_dir()]
+
+
+def _display_path_from(project_dir: Path, index_data) -> str:
+    """Take projectPath from a decoded index, else derive it from the dir name."""
+    display_path = None
+    if isinstance(index_data, list) and index_data and isinstance(index_data[0], dict):
+        display_path = index_data[0].get("projectPath")
+
+    if not display_path:
+        # Derive from folder name: -Users-farhaj-dev-foo -> /Users/farhaj/dev/foo
+        name = project_dir.name
+        display_path = name.translate(_DASH_TO_SLASH) if name.startswith("-") else name
+    return display_path
 
 
 def _parse_iso(value: str | None) -> datetime | None:
     """Parse an ISO 8601 datetime string."""
-    if not value:
+    if not value or not isinstance(value, str):
         return None
+    return _parse_iso_cached(value)
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso_cached(value: str) -> datetime | None:
+    # datetime.fromisoformat is already implemented in C, so the win here is
+    # skipping repeat parses: index timestamps are re-read on every listing.
     try:
         if value.endswith("Z"):
             value = value[:-1] + "+00:00"
         return datetime.fromisoformat(value)
-    except (ValueError, TypeError):
+    except ValueError:
         return None
@@ -6,24 +6,159 @@ workspace-level and global storage locations. All database access is read-only.
 
 import json
 import logging
+import os
 import sqlite3
+import threading
 import urllib.parse
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import cache, lru_cache
 from pathlib import Path
+from typing import Generic, TypeVar
 
 from ..config import get_cursor_global_path, get_cursor_workspace_path
 from ..core import Message, Session, Workspace
 from ..provider import ChatProvider
 
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # orjson is an optional speedup
+    _loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+_UTC = timezone.utc
+
+_GLOBAL_CHAT_KEY = "workbench.panel.aichat.view.aichat.chatdata"
+
+_WORKSPACE_KEYS = (
+    "composer.composerData",
+    "aiService.prompts",
+    "aiService.generations",
+)
+
+# Canonical SQL text. sqlite3 caches prepared statements per connection by
+# their exact string, so reusing these constants skips re-parsing.
+_HAS_CHAT_SQL = "SELECT 1 FROM ItemTable WHERE key = 'composer.composerData' LIMIT 1"
+_SELECT_VALUE_SQL = "SELECT value FROM ItemTable WHERE key = ?"
+_SELECT_WORKSPACE_SQL = (
+    f"SELECT key, value FROM ItemTable WHERE key IN ({','.join('?' * len(_WORKSPACE_KEYS))})"
+)
+
+# Read-side tuning applied once per cached connection. The databases stay
+# shared with a running Cursor, so no immutable=1 or exclusive locking.
+_READ_PRAGMAS = (
+    "PRAGMA query_only = 1",
+    "PRAGMA cache_size = -20000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+)
+
+# Idle connections kept open per provider. Each holds file descriptors and
+# its own page cache, so a machine with hundreds of workspaces must not keep
+# one open for every database it has ever listed.
+_MAX_CONNS = 32
+
+_K = TypeVar("_K")
+_V = TypeVar("_V")
+
+
+class _LRUCache(Generic[_K, _V]):
+    """A thread-safe mapping that keeps only its most recently used entries.
+
+    Per-database caches use it with the same bound as the connection pool,
+    so listing hundreds of workspaces doesn't pin all of their decoded data.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._data: OrderedDict[_K, _V] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: _K) -> bool:
+        return key in self._data
+
+    def get(self, key: _K) -> _V | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def __setitem__(self, key: _K, value: _V) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+
+@dataclass(slots=True)
+class _CachedConn:
+    """A cached connection and the number of threads currently using it."""
+
+    conn: sqlite3.Connection
+    users: int = 0
+    evicted: bool = False
+
+
+@dataclass(slots=True)
+class _WorkspaceData:
+    """Decoded chat blobs from one workspace database."""
+
+    composers: list[dict]
+    composers_by_id: dict[str, dict]
+    prompts: list[str]
+    generations: list[dict]
+    gens_sorted: list[dict]  # generations with a numeric unixMs, ascending
+    ts_sorted: list[int]  # unixMs of gens_sorted, for bisecting
+
 
 class CursorProvider(ChatProvider):
     """Provider for Cursor IDE chat history."""
 
     name = "cursor"
 
+    def __init__(self, base_path: Path | None = None) -> None:
+        # Overrides the detected workspaceStorage directory when given
+        self._base_path = base_path
+        self._conns: OrderedDict[Path, _CachedConn] = OrderedDict()
+        self._conns_lock = threading.Lock()
+        self._has_chat_cache: _LRUCache[Path, tuple[tuple[int, ...], bool]] = _LRUCache(_MAX_CONNS)
+        self._global_tabs: dict[
+            Path, tuple[tuple[int, ...], tuple[list[dict], dict[str, dict]]]
+        ] = {}
+        self._workspace_data: _LRUCache[
+            Path, tuple[tuple[int, ...], _WorkspaceData | None]
+        ] = _LRUCache(_MAX_CONNS)
+
+    def close(self) -> None:
+        """Close every cached database connection."""
+        with self._conns_lock:
+            cached = list(self._conns.values())
+            self._conns.clear()
+        for entry in cached:
+            entry.conn.close()
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except Exception:
+            pass
+
     def get_base_path(self) -> Path:
+        if self._base_path is not None:
+            return self._base_path
         return get_cursor_workspace_path()
 
     def is_available(self) -> bool:
@@ -34,31 +169,8 @@ class CursorProvider(ChatProvider):
         if not base.is_dir():
             return []
 
-        workspaces = []
-        for ws_dir in base.iterdir():
-            if not ws_dir.is_dir():
-                continue
-
-            db_path = ws_dir / "state.vscdb"
-            if not db_path.exists():
-                continue
-
-            # Read workspace.json for the project path
-            display_path = self._read_workspace_path(ws_dir)
-            if not display_path:
-                continue
-
-            # Check if there's any chat data
-            if not self._has_chat_data(db_path):
-                continue
-
-            workspaces.append(Workspace(
-                id=ws_dir.name,
-                display_path=display_path,
-                source="cursor",
-            ))
-
-        return workspaces
+        ws_dirs = _iter_subdirs(base)
+        return [ws for ws in _io_pool().map(self._workspace_from_dir, ws_dirs) if ws]
 
     def list_sessions(self, workspace_id: str | None = None) -> list[Session]:
         base = self.get_base_path()
@@ -68,29 +180,41 @@ class CursorProvider(ChatProvider):
         sessions = []
 
         if workspace_id:
-            ws_dirs = [base / workspace_id]
+            sessions.extend(self._sessions_from_dir(base / workspace_id))
         else:
-            ws_dirs = [d for d in base.iterdir() if d.is_dir()]
-
-        for ws_dir in ws_dirs:
-            if not ws_dir.is_dir():
-                continue
-            db_path = ws_dir / "state.vscdb"
-            if not db_path.exists():
-                continue
-
-            display_path = self._read_workspace_path(ws_dir)
-            if not display_path:
-                continue
-
-            ws_sessions = self._read_sessions_from_db(db_path, ws_dir.name, display_path)
-            sessions.extend(ws_sessions)
+            ws_dirs = _iter_subdirs(base)
+            for ws_sessions in _io_pool().map(self._sessions_from_dir, ws_dirs):
+                sessions.extend(ws_sessions)
 
         # Also read global storage sessions
         sessions.extend(self._read_global_sessions())
 
         return sessions
 
+    def data_version(self) -> tuple | None:
+        """Stat every workspace database and workspace.json, plus the global DB."""
+        base = self.get_base_path()
+        try:
+            with os.scandir(base) as it:
+                ws_dirs = [entry.path for entry in it if entry.is_dir()]
+        except OSError:
+            return None
+
+        global_db = get_cursor_global_path()
+        return (
+            str(base),
+            tuple(
+                (
+                    ws_dir,
+                    _stat_key(os.path.join(ws_dir, "workspace.json")),
+                    _db_version(Path(ws_dir, "state.vscdb")),
+                )
+                for ws_dir in ws_dirs
+            ),
+            str(global_db),
+            _db_version(global_db),
+        )
+
     def get_session_messages(self, session_id: str) -> list[Message]:
         """Get messages for a session.
 
@@ -109,74 +233,211 @@ class CursorProvider(ChatProvider):
             composer_id = parts[2]
             return self._get_workspace_messages(workspace_hash, composer_id)
 
+    def session_version(self, session_id: str) -> tuple | None:
+        """Stat the database the session is read from."""
+        parts = session_id.split(":", 2)
+        if len(parts) < 3 or parts[0] != "cursor":
+            return None
+        if parts[1] == "global":
+            db_path = get_cursor_global_path()
+        else:
+            db_path = self.get_base_path() / parts[1] / "state.vscdb"
+        version = _db_version(db_path)
+        return None if version is None else (str(db_path), version)
+
     # ── Private helpers ──────────────────────────────────────────────
 
+    def _workspace_from_dir(self, ws_dir: Path) -> Workspace | None:
+        """Build a Workspace for ws_dir, or None if it has no chat data."""
+        db_path = ws_dir / "state.vscdb"
+        if not db_path.exists():
+            return None
+
+        # Read workspace.json for the project path
+        display_path = self._read_workspace_path(ws_dir)
+        if not display_path:
+            return None
+
+        # Check if there's any chat data
+        if not self._has_chat_data(db_path):
+            return None
+
+        return Workspace(
+            id=ws_dir.name,
+            display_path=display_path,
+            source="cursor",
+        )
+
+    def _sessions_from_dir(self, ws_dir: Path) -> list[Session]:
+        """Read every session stored in one workspace directory."""
+        if not ws_dir.is_dir():
+            return []
+        db_path = ws_dir / "state.vscdb"
+        if not db_path.exists():
+            return []
+
+        display_path = self._read_workspace_path(ws_dir)
+        if not display_path:
+            return []
+
+        return self._read_sessions_from_db(db_path, ws_dir.name, display_path)
+
     def _read_workspace_path(self, ws_dir: Path) -> str | None:
         """Extract the project path from workspace.json."""
         ws_json = ws_dir / "workspace.json"
         if not ws_json.exists():
             return None
         try:
-            data = json.loads(ws_json.read_text(encoding="utf-8"))
+            data = _loads(ws_json.read_bytes())
             folder_uri = data.get("folder", "")
             if folder_uri.startswith("file://"):
-                return urllib.parse.unquote(folder_uri[7:])
+                path = folder_uri[7:]
+                return urllib.parse.unquote(path) if "%" in path else path
             return folder_uri or None
         except (json.JSONDecodeError, OSError) as e:
             logger.warning("Failed to read workspace.json in %s: %s", ws_dir, e)
             return None
 
+    @contextmanager
+    def _connection(self, db_path: Path) -> Iterator[sqlite3.Connection]:
+        """Borrow a cached read-only connection to db_path.
+
+        At most _MAX_CONNS connections are cached. The least recently used
+        one is evicted and closed once no thread is still reading from it.
+        """
+        with self._conns_lock:
+            entry = self._conns.get(db_path)
+            if entry is not None:
+                self._conns.move_to_end(db_path)
+                entry.users += 1
+        if entry is None:
+            # Open outside the lock so a slow open doesn't stall other
+            # threads' borrows; if another thread won the race, use its.
+            conn = _open_db(db_path)
+            with self._conns_lock:
+                entry = self._conns.get(db_path)
+                if entry is None:
+                    entry = _CachedConn(conn)
+                    self._conns[db_path] = entry
+                    conn = None
+                    while len(self._conns) > _MAX_CONNS:
+                        _, old = self._conns.popitem(last=False)
+                        old.evicted = True
+                        if not old.users:
+                            old.conn.close()
+                else:
+                    self._conns.move_to_end(db_path)
+                entry.users += 1
+            if conn is not None:
+                conn.close()
+        try:
+            yield entry.conn
+        finally:
+            with self._conns_lock:
+                entry.users -= 1
+                if entry.evicted and not entry.users:
+                    entry.conn.close()
+
     def _has_chat_data(self, db_path: Path) -> bool:
-        """Check if a workspace database contains any chat data."""
+        """Check if a workspace database contains any chat data.
+
+        The answer is reused until the database file or its WAL changes.
+        """
+        version = _db_version(db_path)
+        cached = self._has_chat_cache.get(db_path)
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
         try:
-            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT 1 FROM ItemTable WHERE key = 'composer.composerData' LIMIT 1"
-            )
-            has_data = cur.fetchone() is not None
-            conn.close()
-            return has_data
+            with self._connection(db_path) as conn:
+                has_data = bool(conn.execute(_HAS_CHAT_SQL).fetchall())
         except (sqlite3.Error, OSError) as e:
             logger.debug("Cannot check chat data in %s: %s", db_path, e)
             return False
+        if version is not None:
+            self._has_chat_cache[db_path] = (version, has_data)
+        return has_data
 
-    def _query_item_table(self, db_path: Path, key: str) -> str | None:
+    def _query_item_table(self, db_path: Path, key: str) -> str | bytes | None:
         """Read a single key from the ItemTable."""
         try:
-            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
-            cur = conn.cursor()
-            cur.execute("SELECT value FROM ItemTable WHERE key = ?", (key,))
-            row = cur.fetchone()
-            conn.close()
-            if row:
-                val = row[0]
-                return val if isinstance(val, str) else val.decode("utf-8", errors="replace")
-            return None
+            # fetchall() runs the statement to completion so no read
+            # transaction is left open on the shared connection.
+            with self._connection(db_path) as conn:
+                rows = conn.execute(_SELECT_VALUE_SQL, (key,)).fetchall()
+            return rows[0][0] if rows else None
         except (sqlite3.Error, OSError) as e:
             logger.warning("Failed to read key '%s' from %s: %s", key, db_path, e)
             return None
 
+    def _query_item_table_many(
+        self, db_path: Path, keys: tuple[str, ...]
+    ) -> dict[str, str | bytes]:
+        """Read several ItemTable keys in one query; missing keys are omitted."""
+        if keys == _WORKSPACE_KEYS:
+            sql = _SELECT_WORKSPACE_SQL
+        else:
+            sql = f"SELECT key, value FROM ItemTable WHERE key IN ({','.join('?' * len(keys))})"
+        try:
+            with self._connection(db_path) as conn:
+                rows = conn.execute(sql, keys).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Failed to read keys %s from %s: %s", keys, db_path, e)
+            return {}
+        return {key: val for key, val in rows if val is not None}
+
+    def _load_workspace_data(self, db_path: Path) -> _WorkspaceData | None:
+        """Decode a workspace's chat blobs, reusing them until the DB changes."""
+        version = _db_version(db_path)
+        cached = self._workspace_data.get(db_path)
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+
+        values = self._query_item_table_many(db_path, _WORKSPACE_KEYS)
+        raw = values.get("composer.composerData")
+        data = None
+        if raw:
+            try:
+                composer_data = _loads_value(raw)
+            except json.JSONDecodeError as e:
+                logger.warning("Corrupt composerData in %s: %s", db_path, e)
+            else:
+                composers = composer_data.get("allComposers", [])
+                composers_by_id: dict[str, dict] = {}
+                for comp in composers:
+                    if comp.get("composerId"):
+                        composers_by_id.setdefault(comp["composerId"], comp)
+                generations = _parse_generations(values.get("aiService.generations"))
+                gens_sorted = sorted(
+                    (g for g in generations if isinstance(g.get("unixMs"), (int, float))),
+                    key=lambda g: g["unixMs"],
+                )
+                data = _WorkspaceData(
+                    composers=composers,
+                    composers_by_id=composers_by_id,
+                    prompts=_parse_prompts(values.get("aiService.prompts")),
+                    generations=generations,
+                    gens_sorted=gens_sorted,
+                    ts_sorted=[g["unixMs"] for g in gens_sorted],
+                )
+
+        # An empty result may be a transient read error; don't pin it.
+        if version is not None and values:
+            self._workspace_data[db_path] = (version, data)
+        return data
+
     def _read_sessions_from_db(
         self, db_path: Path, workspace_hash: str, display_path: str
     ) -> list[Session]:
         """Extract session metadata from a workspace database."""
-        raw = self._query_item_table(db_path, "composer.composerData")
-        if not raw:
-            return []
-
-        try:
-            data = json.loads(raw)
-        except json.JSONDecodeError as e:
-            logger.warning("Corrupt composerData in %s: %s", db_path, e)
+        data = self._load_workspace_data(db_path)
+        if data is None:
             return []
 
-        composers = data.get("allComposers", [])
+        composers = data.composers
+        prompts = data.prompts
+        generations = data.generations
         sessions = []
-
-        # Also get prompts and generations counts for message estimation
-        prompts = self._read_prompts(db_path)
-        generations = self._read_generations(db_path)
+        fallback_title = _truncate(prompts[0] if prompts else "Untitled", 80)
 
         for comp in composers:
             composer_id = comp.get("composerId", "")
@@ -189,13 +450,13 @@ class CursorProvider(ChatProvider):
 
             # Estimate message count from generations in this time range
             msg_count = self._count_messages_in_range(
-                generations, created_ms, updated_ms
+                generations, data.ts_sorted, created_ms, updated_ms
             )
 
             created = _ms_to_datetime(created_ms)
             updated = _ms_to_datetime(updated_ms)
 
-            title = name or _truncate(prompts[0] if prompts else "Untitled", 80)
+            title = name or fallback_title
 
             sessions.append(Session(
                 id=f"cursor:{workspace_hash}:{composer_id}",
@@ -210,54 +471,25 @@ class CursorProvider(ChatProvider):
 
         return sessions
 
-    def _read_prompts(self, db_path: Path) -> list[str]:
-        """Read user prompts from aiService.prompts."""
-        raw = self._query_item_table(db_path, "aiService.prompts")
-        if not raw:
-            return []
-        try:
-            data = json.loads(raw)
-            return [
-                p.get("text", "") for p in data
-                if isinstance(p, dict) and p.get("text")
-            ]
-        except json.JSONDecodeError:
-            return []
-
-    def _read_generations(self, db_path: Path) -> list[dict]:
-        """Read generation metadata from aiService.generations."""
-        raw = self._query_item_table(db_path, "aiService.generations")
-        if not raw:
-            return []
-        try:
-            data = json.loads(raw)
-            return [g for g in data if isinstance(g, dict)]
-        except json.JSONDecodeError:
-            return []
-
     def _count_messages_in_range(
         self,
         generations: list[dict],
+        ts_sorted: list[int],
         start_ms: int | None,
         end_ms: int | None,
     ) -> int:
-        """Count generations that fall within a session's time range."""
+        """Count generations that fall within a session's time range.
+
+        ts_sorted holds the generations' timestamps in ascending order, so
+        each count is two binary searches instead of a scan.
+        """
         if not generations:
             return 0
         if start_ms is None and end_ms is None:
             return len(generations)
 
-        count = 0
-        for gen in generations:
-            ts = gen.get("unixMs")
-            if ts is None:
-                continue
-            if start_ms is not None and ts < start_ms:
-                continue
-            if end_ms is not None and ts > end_ms:
-                continue
-            count += 1
-        return count
+        lo, hi = _ts_range(ts_sorted, start_ms, end_ms)
+        return max(0, hi - lo)
 
     def _get_workspace_messages(
         self, workspace_hash: str, composer_id: str
@@ -267,45 +499,22 @@ class CursorProvider(ChatProvider):
         if not db_path.exists():
             return []
 
-        # Get composer time range
-        raw = self._query_item_table(db_path, "composer.composerData")
-        if not raw:
+        data = self._load_workspace_data(db_path)
+        if data is None:
             return []
 
-        try:
-            data = json.loads(raw)
-        except json.JSONDecodeError:
-            return []
-
-        # Find the target composer
-        target = None
-        for comp in data.get("allComposers", []):
-            if comp.get("composerId") == composer_id:
-                target = comp
-                break
+        target = data.composers_by_id.get(composer_id)
         if not target:
             return []
 
         start_ms = target.get("createdAt")
         end_ms = target.get("lastUpdatedAt")
+        prompts = data.prompts
 
-        # Read prompts and generations
-        prompts = self._read_prompts(db_path)
-        generations = self._read_generations(db_path)
-
-        # Correlate by chronological position:
-        # Filter generations to this session's time range
-        session_gens = []
-        for gen in generations:
-            ts = gen.get("unixMs")
-            if ts is None:
-                continue
-            if start_ms is not None and ts < start_ms:
-                continue
-            if end_ms is not None and ts > end_ms:
-                continue
-            session_gens.append(gen)
-        session_gens.sort(key=lambda g: g.get("unixMs", 0))
+        # Correlate by chronological position: the session's generations
+        # are a contiguous slice of the time-sorted index.
+        lo, hi = _ts_range(data.ts_sorted, start_ms, end_ms)
+        session_gens = data.gens_sorted[lo:hi]
 
         # Match prompts to generations chronologically
         # Since prompts and generations aren't 1:1, we interleave them
@@ -351,36 +560,53 @@ class CursorProvider(ChatProvider):
 
         return messages
 
-    def _read_global_sessions(self) -> list[Session]:
-        """Read sessions from global storage chatdata."""
-        global_db = get_cursor_global_path()
-        if not global_db.exists():
-            return []
+    def _load_global_tabs(self, global_db: Path) -> tuple[list[dict], dict[str, dict]]:
+        """Decode the global chatdata tabs and index them by tabId.
 
-        raw = self._query_item_table(
-            global_db, "workbench.panel.aichat.view.aichat.chatdata"
-        )
+        Reused until the global database changes, so the session list and
+        each opened tab share one decode.
+        """
+        version = _db_version(global_db)
+        cached = self._global_tabs.get(global_db)
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+
+        raw = self._query_item_table(global_db, _GLOBAL_CHAT_KEY)
         if not raw:
-            return []
+            return [], {}
 
         try:
-            data = json.loads(raw)
+            data = _loads_value(raw)
         except json.JSONDecodeError:
+            return [], {}
+
+        tabs = data.get("tabs", [])
+        tabs_by_id: dict[str, dict] = {}
+        for tab in tabs:
+            tabs_by_id.setdefault(tab.get("tabId"), tab)
+        result = (tabs, tabs_by_id)
+        if version is not None:
+            self._global_tabs[global_db] = (version, result)
+        return result
+
+    def _read_global_sessions(self) -> list[Session]:
+        """Read sessions from global storage chatdata."""
+        global_db = get_cursor_global_path()
+        if not global_db.exists():
             return []
 
+        tabs, _ = self._load_global_tabs(global_db)
+
         sessions = []
-        for tab in data.get("tabs", []):
+        for tab in tabs:
             tab_id = tab.get("tabId", "")
             bubbles = tab.get("bubbles", [])
             if not tab_id or not bubbles:
                 continue
 
-            # Derive title from first user bubble
-            title = "Chat"
-            for b in bubbles:
-                if b.get("type") == "user":
-                    title = _truncate(b.get("text", "Chat"), 80)
-                    break
+            # Derive title from first user bubble; the scan stops there
+            first_user = next((b for b in bubbles if b.get("type") == "user"), None)
+            title = _truncate(first_user.get("text", "Chat"), 80) if first_user else "Chat"
 
             sessions.append(Session(
                 id=f"cursor:global:{tab_id}",
@@ -399,42 +625,145 @@ class CursorProvider(ChatProvider):
         if not global_db.exists():
             return []
 
-        raw = self._query_item_table(
-            global_db, "workbench.panel.aichat.view.aichat.chatdata"
-        )
-        if not raw:
+        _, tabs_by_id = self._load_global_tabs(global_db)
+        tab = tabs_by_id.get(tab_id)
+        if tab is None:
             return []
 
-        try:
-            data = json.loads(raw)
-        except json.JSONDecodeError:
-            return []
+        messages = []
+        for bubble in tab.get("bubbles", []):
+            bubble_type = bubble.get("type", "")
+            text = bubble.get("text", "")
+            role = "user" if bubble_type == "user" else "assistant"
+            messages.append(Message(
+                role=role,
+                content=text,
+                message_type="text",
+            ))
+        return messages
 
-        for tab in data.get("tabs", []):
-            if tab.get("tabId") != tab_id:
-                continue
 
-            messages = []
-            for bubble in tab.get("bubbles", []):
-                bubble_type = bubble.get("type", "")
-                text = bubble.get("text", "")
-                role = "user" if bubble_type == "user" else "assistant"
-                messages.append(Message(
-                    role=role,
-                    content=text,
-                    message_type="text",
-                ))
-            return messages
+def _ts_range(
+    ts_sorted: list[int], start_ms: int | None, end_ms: int | None
+) -> tuple[int, int]:
+    """Return the [lo, hi) index range of ts_sorted within start..end inclusive."""
+    lo = bisect_left(ts_sorted, start_ms) if start_ms is not None else 0
+    hi = bisect_right(ts_sorted, end_ms) if end_ms is not None else len(ts_sorted)
+    return lo, hi
+
+
+def _iter_subdirs(base: Path) -> list[Path]:
+    """List the immediate subdirectories of base.
+
+    Uses os.scandir so the entry type comes from the directory listing
+    itself instead of a separate stat() per entry.
+    """
+    with os.scandir(base) as it:
+        return [Path(entry.path) for entry in it if entry.is_dir()]
+
+
+def _stat_key(path: str) -> tuple[int, int] | None:
+    """Return (mtime_ns, size) for path, or None if it can't be stat-ed."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
 
+def _db_version(db_path: Path) -> tuple[int, ...] | None:
+    """Return a change token for a SQLite file and its WAL, or None if missing.
+
+    Writes in WAL mode land in the -wal file and leave the main file's
+    mtime alone until a checkpoint, so both files are part of the token.
+    """
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return None
+    try:
+        wal = os.stat(f"{db_path}-wal")
+    except OSError:
+        return (st.st_mtime_ns, st.st_size)
+    return (st.st_mtime_ns, st.st_size, wal.st_mtime_ns, wal.st_size)
+
+
+def _open_db(db_path: Path) -> sqlite3.Connection:
+    """Open db_path read-only, tuned for repeated reads from many threads."""
+    conn = sqlite3.connect(
+        f"file:{db_path}?mode=ro",
+        uri=True,
+        check_same_thread=False,
+        cached_statements=128,
+    )
+    try:
+        for pragma in _READ_PRAGMAS:
+            conn.execute(pragma)
+    except sqlite3.Error:
+        conn.close()
+        raise
+    return conn
+
+
+@cache
+def _io_pool() -> ThreadPoolExecutor:
+    """Return the shared thread pool used for per-workspace reads."""
+    return ThreadPoolExecutor(
+        max_workers=min(32, (os.cpu_count() or 1) * 4),
+        thread_name_prefix="cursor",
+    )
+
+
+def _loads_value(raw: str | bytes):
+    """Parse an ItemTable value, handing BLOB bytes to the parser undecoded.
+
+    Values that are not valid UTF-8 are retried with replacement
+    characters, so a stray bad byte does not hide the whole value.
+    """
+    try:
+        return _loads(raw)
+    except ValueError:
+        if isinstance(raw, str):
+            raise
+        return _loads(raw.decode("utf-8", errors="replace"))
+
+
+def _parse_prompts(raw: str | bytes | None) -> list[str]:
+    """Extract user prompt texts from an aiService.prompts value."""
+    if not raw:
+        return []
+    try:
+        data = _loads_value(raw)
+        return [
+            p.get("text", "") for p in data
+            if isinstance(p, dict) and p.get("text")
+        ]
+    except json.JSONDecodeError:
+        return []
+
+
+def _parse_generations(raw: str | bytes | None) -> list[dict]:
+    """Extract generation metadata from an aiService.generations value."""
+    if not raw:
+        return []
+    try:
+        data = _loads_value(raw)
+        return [g for g in data if isinstance(g, dict)]
+    except json.JSONDecodeError:
         return []
 
 
+@lru_cache(maxsize=4096)
 def _ms_to_datetime(ms: int | None) -> datetime | None:
-    """Convert millisecond timestamp to datetime, or None."""
+    """Convert millisecond timestamp to datetime, or None.
+
+    Cached: the same timestamps recur across list and view requests, and
+    datetimes are immutable so sharing them is safe.
+    """
     if ms is None:
         return None
     try:
-        return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+        return datetime.fromtimestamp(ms / 1000, tz=_UTC)
     except (ValueError, OSError, OverflowError):
         return None
 
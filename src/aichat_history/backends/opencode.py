@@ -11,22 +11,45 @@ Supports two storage versions:
 
 import json
 import logging
+import os
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 
 from ..config import get_opencode_path
 from ..core import Message, Session, Workspace
 from ..provider import ChatProvider
 
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # orjson is an optional speedup
+    _loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+_UTC = timezone.utc
+
+# Sort fallback for messages without timestamps
+_MIN_DATETIME = datetime.min.replace(tzinfo=_UTC)
+
+# Part types that mark agent steps and carry no message text
+_LIFECYCLE_PART_TYPES = frozenset({"step-start", "step-finish", "snapshot"})
+
 
 class OpenCodeProvider(ChatProvider):
     """Provider for OpenCode chat history."""
 
     name = "opencode"
 
+    def __init__(self, base_path: Path | None = None) -> None:
+        # Overrides the detected storage directory when given
+        self._base_path = base_path
+
     def get_base_path(self) -> Path:
+        if self._base_path is not None:
+            return self._base_path
         return get_opencode_path()
 
     def is_available(self) -> bool:
@@ -41,10 +64,7 @@ class OpenCodeProvider(ChatProvider):
         workspaces = []
         seen_paths = set()
 
-        for project_dir in session_dir.iterdir():
-            if not project_dir.is_dir():
-                continue
-
+        for project_dir in _iter_subdirs(session_dir):
             display_path = self._get_project_display_path(project_dir)
             if display_path in seen_paths:
                 continue
@@ -68,20 +88,56 @@ class OpenCodeProvider(ChatProvider):
 
         if workspace_id:
             project_dirs = [session_dir / workspace_id]
+            # Counting per session is cheaper than scanning every message dir
+            msg_counts = None
         else:
-            project_dirs = [d for d in session_dir.iterdir() if d.is_dir()]
+            project_dirs = _iter_subdirs(session_dir)
+            msg_counts = _count_messages_by_session(base / "message")
 
         for project_dir in project_dirs:
             if not project_dir.is_dir():
                 continue
 
-            for ses_file in project_dir.glob("ses_*.json"):
-                session = self._parse_session_file(ses_file, base)
+            for name in _json_names(project_dir, "ses_"):
+                session = self._parse_session_file(project_dir / name, base, msg_counts)
                 if session:
                     sessions.append(session)
 
         return sessions
 
+    def data_version(self) -> tuple | None:
+        """Stat every session file and every session's message directory.
+
+        Adding a message file bumps its directory's mtime, which covers
+        the message counts without listing each directory.
+        """
+        base = self.get_base_path()
+        try:
+            with os.scandir(base / "session") as it:
+                project_dirs = [entry.path for entry in it if entry.is_dir()]
+        except OSError:
+            return None
+
+        session_files = []
+        for project_dir in project_dirs:
+            with os.scandir(project_dir) as it:
+                for entry in it:
+                    if entry.name.startswith("ses_") and entry.name.endswith(".json"):
+                        st = entry.stat()
+                        session_files.append((entry.path, st.st_mtime_ns, st.st_size))
+
+        try:
+            with os.scandir(base / "message") as it:
+                message_dirs = [
+                    (entry.name, entry.stat().st_mtime_ns)
+                    for entry in it
+                    if entry.is_dir()
+                ]
+        except OSError:
+            message_dirs = []
+
+        return (str(base), tuple(session_files), tuple(message_dirs))
+
     def get_session_messages(self, session_id: str) -> list[Message]:
         """Get messages for a session.
 
@@ -95,26 +151,57 @@ class OpenCodeProvider(ChatProvider):
         base = self.get_base_path()
         msg_dir = base / "message" / ses_id
 
-        if not msg_dir.is_dir():
-            return []
-
-        messages = []
-        for msg_file in sorted(msg_dir.glob("msg_*.json")):
-            msg = self._parse_message_file(msg_file, base)
-            if msg:
-                messages.append(msg)
+        messages = [
+            msg
+            for name in sorted(_json_names(msg_dir, "msg_"))
+            if (msg := self._parse_message_file(msg_dir / name, base))
+        ]
 
         # Sort by timestamp
-        messages.sort(key=lambda m: m.timestamp or datetime.min.replace(tzinfo=timezone.utc))
+        messages.sort(key=_message_sort_key)
         return messages
 
+    def session_version(self, session_id: str) -> tuple | None:
+        """Stat every message file and every part file of the session.
+
+        Part directories are found by message file name, which matches
+        the message ID OpenCode writes inside it.
+        """
+        parts = session_id.split(":", 1)
+        if len(parts) < 2 or parts[0] != "opencode":
+            return None
+        base = self.get_base_path()
+        msg_dir = base / "message" / parts[1]
+        part_root = base / "part"
+
+        files = []
+        try:
+            with os.scandir(msg_dir) as it:
+                msg_entries = [
+                    entry for entry in it
+                    if entry.name.startswith("msg_") and entry.name.endswith(".json")
+                ]
+        except OSError:
+            return None
+        for entry in msg_entries:
+            st = entry.stat()
+            files.append((entry.name, st.st_mtime_ns, st.st_size))
+            try:
+                with os.scandir(part_root / entry.name[:-len(".json")]) as it:
+                    for part in it:
+                        pst = part.stat()
+                        files.append((part.path, pst.st_mtime_ns, pst.st_size))
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+        return (str(msg_dir), tuple(sorted(files)))
+
     # ── Private helpers ──────────────────────────────────────────────
 
     def _get_project_display_path(self, project_dir: Path) -> str:
         """Get display path from the first session file in a project dir."""
-        for ses_file in project_dir.glob("ses_*.json"):
+        for name in _json_names(project_dir, "ses_"):
             try:
-                data = json.loads(ses_file.read_text(encoding="utf-8"))
+                data = _loads((project_dir / name).read_bytes())
                 directory = data.get("directory")
                 if directory:
                     return directory
@@ -122,10 +209,16 @@ class OpenCodeProvider(ChatProvider):
                 continue
         return project_dir.name
 
-    def _parse_session_file(self, ses_file: Path, base: Path) -> Session | None:
-        """Parse a session JSON file into a Session object."""
+    def _parse_session_file(
+        self, ses_file: Path, base: Path, msg_counts: dict[str, int] | None = None
+    ) -> Session | None:
+        """Parse a session JSON file into a Session object.
+
+        msg_counts maps session IDs to message counts when the caller has
+        already scanned the message tree; otherwise the count is read here.
+        """
         try:
-            data = json.loads(ses_file.read_text(encoding="utf-8"))
+            data = _loads(ses_file.read_bytes())
         except (json.JSONDecodeError, OSError) as e:
             logger.warning("Failed to read session file %s: %s", ses_file, e)
             return None
@@ -139,10 +232,10 @@ class OpenCodeProvider(ChatProvider):
         updated = _ms_to_datetime(time_data.get("updated"))
 
         # Count messages
-        msg_dir = base / "message" / ses_id
-        msg_count = 0
-        if msg_dir.is_dir():
-            msg_count = sum(1 for _ in msg_dir.glob("msg_*.json"))
+        if msg_counts is not None:
+            msg_count = msg_counts.get(ses_id, 0)
+        else:
+            msg_count = len(_json_names(base / "message" / ses_id, "msg_"))
 
         return Session(
             id=f"opencode:{ses_id}",
@@ -163,7 +256,7 @@ class OpenCodeProvider(ChatProvider):
         - v1.0: No parts; only summary.title available for user messages
         """
         try:
-            data = json.loads(msg_file.read_text(encoding="utf-8"))
+            data = _loads(msg_file.read_bytes())
         except (json.JSONDecodeError, OSError) as e:
             logger.warning("Failed to read message file %s: %s", msg_file, e)
             return None
@@ -179,51 +272,51 @@ class OpenCodeProvider(ChatProvider):
         metadata = {}
 
         part_dir = base / "part" / msg_id
-        if part_dir.is_dir():
-            for part_file in sorted(part_dir.glob("prt_*.json")):
-                try:
-                    part = json.loads(part_file.read_text(encoding="utf-8"))
-                except (json.JSONDecodeError, OSError):
-                    continue
-
-                part_type = part.get("type", "text")
-
-                if part_type == "text":
-                    text = part.get("text", "")
-                    if text:
-                        content_parts.append(text)
-                elif part_type == "tool":
-                    # v1.1 tool format: {"type":"tool", "tool":"grep", "state":{"input":{}, "output":"..."}}
-                    tool_name = part.get("tool", "unknown")
-                    state = part.get("state", {})
-                    tool_input = state.get("input", {})
-                    tool_output = state.get("output", "")
-                    status = state.get("status", "")
-                    summary = f"[Tool: {tool_name}]"
-                    if tool_input:
-                        # Show a compact input summary
-                        input_summary = ", ".join(
-                            f"{k}={v}" for k, v in tool_input.items()
-                            if isinstance(v, (str, int, bool)) and str(v)
-                        )
-                        if input_summary:
-                            summary = f"[Tool: {tool_name} ({input_summary})]"
-                    content_parts.append(summary)
-                    if tool_output:
-                        content_parts.append(f"```\n{tool_output}\n```")
-                    message_type = "tool_call"
-                    metadata["tool_name"] = tool_name
-                elif part_type == "patch":
-                    content_parts.append("[Patch/Edit]")
-                    message_type = "diff"
-                elif part_type == "step-start":
-                    # Lifecycle marker, skip
-                    continue
-                else:
-                    # Unknown type — try to extract any text
-                    text = part.get("text", "")
-                    if text:
-                        content_parts.append(text)
+        # One scandir both probes the directory and lists it
+        for name in sorted(_json_names(part_dir, "prt_")):
+            try:
+                with open(os.path.join(part_dir, name), "rb") as f:
+                    part = _loads(f.read())
+            except (json.JSONDecodeError, OSError):
+                continue
+
+            part_type = part.get("type", "text")
+
+            if part_type in _LIFECYCLE_PART_TYPES:
+                continue
+            if part_type == "text":
+                text = part.get("text", "")
+                if text:
+                    content_parts.append(text)
+            elif part_type == "tool":
+                # v1.1 tool format: {"type":"tool", "tool":"grep", "state":{"input":{}, "output":"..."}}
+                tool_name = part.get("tool", "unknown")
+                state = part.get("state", {})
+                tool_input = state.get("input", {})
+                tool_output = state.get("output", "")
+                status = state.get("status", "")
+                summary = f"[Tool: {tool_name}]"
+                if tool_input:
+                    # Show a compact input summary
+                    input_summary = ", ".join(
+                        f"{k}={v}" for k, v in tool_input.items()
+                        if isinstance(v, (str, int, bool)) and str(v)
+                    )
+                    if input_summary:
+                        summary = f"[Tool: {tool_name} ({input_summary})]"
+                content_parts.append(summary)
+                if tool_output:
+                    content_parts.append(f"```\n{tool_output}\n```")
+                message_type = "tool_call"
+                metadata["tool_name"] = tool_name
+            elif part_type == "patch":
+                content_parts.append("[Patch/Edit]")
+                message_type = "diff"
+            else:
+                # Unknown type — try to extract any text
+                text = part.get("text", "")
+                if text:
+                    content_parts.append(text)
 
         content = "\n".join(content_parts) if content_parts else ""
 
@@ -256,11 +349,55 @@ class OpenCodeProvider(ChatProvider):
         )
 
 
+def _message_sort_key(msg: Message) -> datetime:
+    """Order messages by timestamp, untimed ones first."""
+    return msg.timestamp or _MIN_DATETIME
+
+
+def _iter_subdirs(base: Path) -> list[Path]:
+    """List the immediate subdirectories of base, via a single scandir pass."""
+    with os.scandir(base) as it:
+        return [Path(entry.path) for entry in it if entry.is_dir()]
+
+
+def _json_names(directory: Path | str, prefix: str) -> list[str]:
+    """Return names of {prefix}*.json entries in directory, unsorted.
+
+    A single scandir pass; a missing directory yields an empty list.
+    """
+    try:
+        with os.scandir(directory) as it:
+            return [
+                entry.name for entry in it
+                if entry.name.startswith(prefix) and entry.name.endswith(".json")
+            ]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def _count_messages_by_session(message_root: Path) -> dict[str, int]:
+    """Count msg_*.json files under every session directory in one walk."""
+    try:
+        with os.scandir(message_root) as it:
+            return {
+                entry.name: len(_json_names(entry.path, "msg_"))
+                for entry in it
+                if entry.is_dir()
+            }
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
+
+
+@lru_cache(maxsize=4096)
 def _ms_to_datetime(ms: int | None) -> datetime | None:
-    """Convert millisecond timestamp to datetime, or None."""
+    """Convert millisecond timestamp to datetime, or None.
+
+    Cached: the same timestamps recur across list and view requests, and
+    datetimes are immutable so sharing them is safe.
+    """
     if ms is None:
         return None
     try:
-        return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+        return datetime.fromtimestamp(ms / 1000, tz=_UTC)
     except (ValueError, OSError, OverflowError):
         return None
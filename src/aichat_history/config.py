@@ -2,6 +2,7 @@
 
 import os
 import sys
+from functools import cache
 from pathlib import Path
 
 
@@ -19,8 +20,14 @@ def get_cursor_workspace_path() -> Path:
         return Path.home() / ".config" / "Cursor" / "User" / "workspaceStorage"
 
 
+@cache
 def get_cursor_global_path() -> Path:
-    """Return the path to Cursor's globalStorage state.vscdb."""
+    """Return the path to Cursor's globalStorage state.vscdb.
+
+    Resolved once per process: every session listing and global session
+    read needs it. Call get_cursor_global_path.cache_clear() after
+    changing AICHAT_CURSOR_PATH.
+    """
     env = os.environ.get("AICHAT_CURSOR_PATH")
     if env:
         # If custom path set, assume it's the parent and globalStorage is alongside workspaceStorage
@@ -14,7 +14,7 @@ class Workspace:
     source: str  # "cursor" | "claude_code" | "opencode"
 
 
-@dataclass
+@dataclass(slots=True)
 class Session:
     """A single chat conversation."""
 
@@ -28,7 +28,7 @@ class Session:
     project_path: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """A single message within a chat session."""
 
@@ -1,6 +1,7 @@
 """Abstract base class for chat history providers."""
 
 from abc import ABC, abstractmethod
+from collections.abc import Hashable
 from pathlib import Path
 
 from .core import Message, Session, Workspace
@@ -15,6 +16,19 @@ class ChatProvider(ABC):
 
     name: str  # "cursor", "claude_code", "opencode"
 
+    @classmethod
+    def probe(cls) -> "ChatProvider | None":
+        """Return an instance if this IDE's data is available, else None.
+
+        Never raises: a backend that fails to construct or probe is
+        treated as not installed.
+        """
+        try:
+            provider = cls()
+            return provider if provider.is_available() else None
+        except Exception:
+            return None
+
     @abstractmethod
     def get_base_path(self) -> Path:
         """Return the root directory where this IDE stores chat data."""
@@ -32,10 +46,33 @@ class ChatProvider(ABC):
 
     @abstractmethod
     def list_sessions(self, workspace_id: str | None = None) -> list[Session]:
-        """Return chat sessions, optionally filtered by workspace."""
+        """Return chat sessions, optionally filtered by workspace.
+
+        This backs every /api/sessions request, so implementations should
+        read only session metadata (index files, headers, directory
+        listings) and leave full transcripts to get_session_messages().
+        """
         ...
 
     @abstractmethod
     def get_session_messages(self, session_id: str) -> list[Message]:
         """Return all messages for a given session ID."""
         ...
+
+    def data_version(self) -> Hashable | None:
+        """Return a token that changes whenever list_sessions() would.
+
+        Callers may reuse a previous full listing while the token is
+        unchanged, so it must be much cheaper than listing (stat calls,
+        not file reads). The default of None means the backend cannot
+        tell, and listings are never reused.
+        """
+        return None
+
+    def session_version(self, session_id: str) -> Hashable | None:
+        """Return a token that changes whenever get_session_messages() would.
+
+        The same contract as data_version(), for a single session: stat
+        calls only. None (the default) means messages are never reused.
+        """
+        return None
@@ -1,38 +1,230 @@
 """FastAPI web server for aichat-history."""
 
+import asyncio
+import hashlib
+import heapq
+import json
 import logging
+import threading
+from collections import ChainMap, OrderedDict
+from collections.abc import Hashable, Iterator
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import cache
+from operator import attrgetter
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import FileResponse, HTMLResponse, Response
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse, HTMLResponse, Response, StreamingResponse
 
 from .backends import get_available_providers
-from .export import session_to_json, session_to_markdown
+from .core import Message, Session
+from .export import iter_session_json, iter_session_markdown
 from .provider import ChatProvider
 
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="aichat-history", version="0.1.0")
 
-# Provider cache (populated on first request)
-_providers: list[ChatProvider] | None = None
+_INDEX_PATH = Path(__file__).parent / "static" / "index.html"
+
+# (mtime_ns, bytes) of the last index.html served
+_index_cache: tuple[int, bytes] | None = None
+
+# Session ID prefix -> provider name
+_SOURCE_MAP = {"cursor": "cursor", "claude": "claude_code", "opencode": "opencode"}
+
+# Full session listings per provider name, keyed by the data version they
+# were built from
+_session_cache: dict[str, "_Listing"] = {}
+
+# (provider name, session ID) -> (session version, messages), least
+# recently used first
+_messages_cache: OrderedDict[tuple[str, str], tuple[Hashable, list[Message]]] = OrderedDict()
+_messages_cache_lock = threading.Lock()
+_MESSAGES_CACHE_SIZE = 32
+
+
+@cache
+def _get_providers() -> tuple[ChatProvider, ...]:
+    """Detect available providers once and cache them."""
+    providers = tuple(get_available_providers())
+    logger.info("Detected providers: %s", [p.name for p in providers])
+    return providers
+
 
+@cache
+def _providers_by_name() -> dict[str, ChatProvider]:
+    """Index the detected providers by name."""
+    # reversed() so the first provider with a given name wins
+    return {p.name: p for p in reversed(_get_providers())}
 
-def _get_providers() -> list[ChatProvider]:
-    """Lazily initialize and cache providers."""
-    global _providers
-    if _providers is None:
-        _providers = get_available_providers()
-        logger.info("Detected providers: %s", [p.name for p in _providers])
-    return _providers
+
+def _clear_caches() -> None:
+    """Forget detected providers and every cached session listing."""
+    _get_providers.cache_clear()
+    _providers_by_name.cache_clear()
+    _session_cache.clear()
+    with _messages_cache_lock:
+        _messages_cache.clear()
+
+
+def _index_html() -> bytes | None:
+    """Return the frontend's bytes, re-reading only when the file changes."""
+    global _index_cache
+    try:
+        mtime = _INDEX_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _index_cache is None or _index_cache[0] != mtime:
+        _index_cache = (mtime, _INDEX_PATH.read_bytes())
+    return _index_cache[1]
 
 
 def _find_provider(source: str) -> ChatProvider | None:
     """Find a provider by name."""
-    for p in _get_providers():
-        if p.name == source:
-            return p
-    return None
+    return _providers_by_name().get(source)
+
+
+@dataclass(slots=True)
+class _Listing:
+    """One provider's full session listing plus lookup structures."""
+
+    version: Hashable | None
+    sessions: list[Session]
+    by_id: dict[str, Session]
+    folded: list[tuple[str, str]]  # casefolded (title, project_path) per session, for search
+    # API dicts keyed by id() of the Session objects held above; only
+    # built for listings that will be reused
+    dicts: dict[int, dict]
+
+    @classmethod
+    def build(cls, version: Hashable | None, sessions: list[Session]) -> "_Listing":
+        return cls(
+            version,
+            sessions,
+            # reversed() so the first session with a given ID wins
+            {s.id: s for s in reversed(sessions)},
+            [(s.title.casefold(), s.project_path.casefold()) for s in sessions],
+            {id(s): _session_to_dict(s) for s in sessions} if version is not None else {},
+        )
+
+
+def _data_version(provider: ChatProvider) -> Hashable | None:
+    """Return provider.data_version(), treating failures as "unknown"."""
+    try:
+        return provider.data_version()
+    except Exception as e:
+        logger.warning("Failed to get data version for %s: %s", provider.name, e)
+        return None
+
+
+def _session_version(provider: ChatProvider, session_id: str) -> Hashable | None:
+    """Return provider.session_version(), treating failures as "unknown"."""
+    try:
+        return provider.session_version(session_id)
+    except Exception as e:
+        logger.warning("Failed to get session version for %s: %s", session_id, e)
+        return None
+
+
+def _cached_listing(provider: ChatProvider) -> _Listing:
+    """Return a provider's full session listing, reusing it while unchanged.
+
+    The listing is rebuilt only when provider.data_version() changes. If a
+    rebuild fails, the previous listing is served instead of an error.
+    Callers must not mutate the returned listing.
+    """
+    version = _data_version(provider)
+    cached = _session_cache.get(provider.name)
+    if version is not None and cached is not None and cached.version == version:
+        return cached
+
+    try:
+        listing = _Listing.build(version, provider.list_sessions())
+    except Exception:
+        if cached is None:
+            raise
+        logger.exception("Failed to refresh sessions for %s; serving cached list", provider.name)
+        return cached
+
+    if version is not None:
+        _session_cache[provider.name] = listing
+    return listing
+
+
+def _cached_messages(provider: ChatProvider, session_id: str) -> list[Message]:
+    """Return a session's messages, reusing them while the session is unchanged.
+
+    Keeps the most recently used sessions whose provider reports a
+    session_version(). Callers must not mutate the returned list.
+    """
+    version = _session_version(provider, session_id)
+    key = (provider.name, session_id)
+    if version is not None:
+        with _messages_cache_lock:
+            cached = _messages_cache.get(key)
+            if cached is not None and cached[0] == version:
+                _messages_cache.move_to_end(key)
+                return cached[1]
+
+    messages = provider.get_session_messages(session_id)
+
+    if version is not None:
+        with _messages_cache_lock:
+            _messages_cache[key] = (version, messages)
+            _messages_cache.move_to_end(key)
+            while len(_messages_cache) > _MESSAGES_CACHE_SIZE:
+                _messages_cache.popitem(last=False)
+    return messages
+
+
+def _message_version(provider: ChatProvider, session_id: str) -> Hashable | None:
+    """Version for a session's messages, falling back to the whole provider's.
+
+    The per-session token keeps a session's ETag stable while unrelated
+    sessions change; providers without one revalidate on any change.
+    """
+    version = _session_version(provider, session_id)
+    if version is not None:
+        return ("session", version)
+    return _data_version(provider)
+
+
+def _listing_safe(provider: ChatProvider) -> _Listing | None:
+    """Return a provider's listing, logging and swallowing backend errors."""
+    try:
+        return _cached_listing(provider)
+    except Exception as e:
+        logger.error("Failed to list sessions for %s: %s", provider.name, e)
+        return None
+
+
+def _etag(*parts: Hashable) -> str:
+    """Return a strong ETag derived from the given response inputs."""
+    digest = hashlib.blake2b(repr((app.version, parts)).encode(), digest_size=8)
+    return f'"{digest.hexdigest()}"'
+
+
+def _not_modified(request: Request, etag: str | None) -> bool:
+    """Whether the request's If-None-Match already names etag."""
+    header = request.headers.get("if-none-match")
+    if etag is None or header is None:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in tags or "*" in tags
+
+
+def _etag_headers(etag: str | None) -> dict[str, str]:
+    """Headers that make browsers revalidate against etag on every use."""
+    if etag is None:
+        return {}
+    return {"ETag": etag, "Cache-Control": "no-cache"}
 
 
 def _session_to_dict(session) -> dict:
@@ -60,16 +252,76 @@ def _message_to_dict(msg) -> dict:
     }
 
 
+def _json_response(content, headers: dict[str, str] | None = None) -> Response:
+    """Encode content directly into a JSON response.
+
+    Bypasses FastAPI's jsonable_encoder walk over every value. With orjson,
+    content may contain dataclasses and datetimes; without it, only plain
+    JSON types.
+    """
+    if orjson is not None:
+        body = orjson.dumps(content)
+    else:
+        body = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def _batched(chunks: Iterator[str], size: int = 64 * 1024) -> Iterator[bytes]:
+    """Join small text chunks into ~size-byte UTF-8 blocks for streaming.
+
+    Starlette iterates sync generators on a worker thread, one hop per
+    chunk, so per-message chunks are grouped before they are sent.
+    """
+    pending: list[str] = []
+    pending_len = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_len += len(chunk)
+        if pending_len >= size:
+            yield "".join(pending).encode()
+            pending.clear()
+            pending_len = 0
+    if pending:
+        yield "".join(pending).encode()
+
+
+class _SafeTitleTable(dict):
+    """str.translate table keeping alphanumerics and "-_ ", dropping the rest.
+
+    Filled lazily per code point, so full Unicode isalnum() semantics are
+    kept without precomputing a table for every character.
+    """
+
+    def __missing__(self, codepoint: int) -> int | None:
+        ch = chr(codepoint)
+        mapped = codepoint if ch.isalnum() or ch in "-_ " else None
+        self[codepoint] = mapped
+        return mapped
+
+
+_SAFE_TITLE_TABLE = _SafeTitleTable()
+
+# Sort fallback for sessions without timestamps
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Sort name -> (key, reverse) for /api/sessions
+_SORT_KEYS = {
+    "newest": (lambda s, _epoch=_EPOCH: s.updated or s.created or _epoch, True),
+    "messages": (attrgetter("message_count"), True),
+    "project": (attrgetter("project_path"), False),
+}
+
+
 # ── Routes ───────────────────────────────────────────────────────
 
 
 @app.get("/")
 async def index():
     """Serve the frontend."""
-    html_path = Path(__file__).parent / "static" / "index.html"
-    if not html_path.exists():
+    html = _index_html()
+    if html is None:
         raise HTTPException(status_code=404, detail="Frontend not found")
-    return HTMLResponse(html_path.read_text(encoding="utf-8"))
+    return HTMLResponse(html)
 
 
 @app.get("/api/sources")
@@ -80,6 +332,7 @@ async def get_sources():
 
 @app.get("/api/sessions")
 async def get_sessions(
+    request: Request,
     source: str | None = Query(None, description="Filter by source"),
     search: str | None = Query(None, description="Search in titles"),
     sort: str = Query("messages", description="Sort: newest, messages, project"),
@@ -93,51 +346,69 @@ async def get_sessions(
     if source:
         providers = [p for p in providers if p.name == source]
 
-    all_sessions = []
-    for provider in providers:
-        try:
-            sessions = provider.list_sessions()
-            all_sessions.extend(sessions)
-        except Exception as e:
-            logger.error("Failed to list sessions for %s: %s", provider.name, e)
-
-    # Filter by search
+    # Backends do blocking file and SQLite I/O; scan them concurrently
+    # on worker threads so the event loop stays responsive.
+    results = await asyncio.gather(
+        *(asyncio.to_thread(_listing_safe, p) for p in providers)
+    )
+    listings = [listing for listing in results if listing is not None]
+
+    # The response is a pure function of the listings and the query, so it
+    # can be revalidated whenever every provider reports a data version
+    etag = None
+    versions = tuple(listing.version if listing else None for listing in results)
+    if None not in versions:
+        names = tuple(p.name for p in providers)
+        etag = _etag(names, versions, source, search, sort, project, limit, offset)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_etag_headers(etag))
+
+    # Filter by search against the listings' pre-casefolded fields
     if search:
-        search_lower = search.lower()
+        needle = search.casefold()
         all_sessions = [
-            s for s in all_sessions
-            if search_lower in s.title.lower()
-            or search_lower in s.project_path.lower()
+            s
+            for listing in listings
+            for s, (title, project_path) in zip(listing.sessions, listing.folded)
+            if needle in title or needle in project_path
         ]
+    else:
+        all_sessions = [s for listing in listings for s in listing.sessions]
 
     # Filter by project
     if project:
         all_sessions = [s for s in all_sessions if s.project_path == project]
 
-    # Sort
-    if sort == "newest":
-        all_sessions.sort(key=lambda s: s.updated or s.created or _epoch(), reverse=True)
-    elif sort == "messages":
-        all_sessions.sort(key=lambda s: s.message_count, reverse=True)
-    elif sort == "project":
-        all_sessions.sort(key=lambda s: s.project_path)
-
     total = len(all_sessions)
-    all_sessions = all_sessions[offset: offset + limit]
+    end = offset + limit
+
+    # Sort only as far as the requested page reaches: a heap selection of
+    # the first `end` sessions is O(N log end) instead of a full sort, and
+    # nlargest/nsmallest order ties exactly like a stable sort would.
+    sort_spec = _SORT_KEYS.get(sort)
+    if sort_spec is None:
+        page = all_sessions[offset:end]
+    else:
+        key, reverse = sort_spec
+        if end < total:
+            select = heapq.nlargest if reverse else heapq.nsmallest
+            page = select(end, all_sessions, key=key)[offset:]
+        else:
+            page = sorted(all_sessions, key=key, reverse=reverse)[offset:end]
 
-    return {
-        "total": total,
-        "sessions": [_session_to_dict(s) for s in all_sessions],
-    }
+    dicts = ChainMap(*(listing.dicts for listing in listings))
+    return _json_response(
+        {"total": total, "sessions": [dicts.get(id(s)) or _session_to_dict(s) for s in page]},
+        _etag_headers(etag),
+    )
 
 
 @app.get("/api/session/{session_id:path}")
-async def get_session(session_id: str):
+async def get_session(session_id: str, request: Request):
     """Return full messages for a session."""
     # Determine which provider owns this session
     source = session_id.split(":")[0] if ":" in session_id else ""
-    source_map = {"cursor": "cursor", "claude": "claude_code", "opencode": "opencode"}
-    provider_name = source_map.get(source)
+    provider_name = _SOURCE_MAP.get(source)
 
     if not provider_name:
         raise HTTPException(status_code=404, detail=f"Unknown source: {source}")
@@ -146,27 +417,37 @@ async def get_session(session_id: str):
     if not provider:
         raise HTTPException(status_code=404, detail=f"Provider not available: {provider_name}")
 
+    version = await asyncio.to_thread(_message_version, provider, session_id)
+    etag = _etag(provider.name, version, session_id) if version is not None else None
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_etag_headers(etag))
+
     try:
-        messages = provider.get_session_messages(session_id)
+        messages = await asyncio.to_thread(_cached_messages, provider, session_id)
     except Exception as e:
         logger.error("Failed to get messages for %s: %s", session_id, e)
         raise HTTPException(status_code=500, detail="Failed to load messages")
 
-    return {
-        "session_id": session_id,
-        "messages": [_message_to_dict(m) for m in messages],
-    }
+    # orjson encodes Message dataclasses (field order matches
+    # _message_to_dict) and their datetimes natively
+    return _json_response(
+        {
+            "session_id": session_id,
+            "messages": messages if orjson is not None else [_message_to_dict(m) for m in messages],
+        },
+        _etag_headers(etag),
+    )
 
 
 @app.get("/api/export/{session_id:path}")
 async def export_session(
     session_id: str,
+    request: Request,
     format: str = Query("md", description="Export format: md or json"),
 ):
     """Export a session as Markdown or JSON."""
     source = session_id.split(":")[0] if ":" in session_id else ""
-    source_map = {"cursor": "cursor", "claude": "claude_code", "opencode": "opencode"}
-    provider_name = source_map.get(source)
+    provider_name = _SOURCE_MAP.get(source)
 
     if not provider_name:
         raise HTTPException(status_code=404, detail=f"Unknown source: {source}")
@@ -177,8 +458,8 @@ async def export_session(
 
     # Find session metadata
     try:
-        sessions = provider.list_sessions()
-        session = next((s for s in sessions if s.id == session_id), None)
+        listing = await asyncio.to_thread(_cached_listing, provider)
+        session = listing.by_id.get(session_id)
     except Exception as e:
         logger.error("Failed to find session %s: %s", session_id, e)
         raise HTTPException(status_code=500, detail="Failed to find session")
@@ -186,31 +467,39 @@ async def export_session(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
+    # The listing version covers the session metadata in the header; the
+    # message version covers the body, which the listing may not track.
+    etag = None
+    if listing.version is not None:
+        version = await asyncio.to_thread(_message_version, provider, session_id)
+        if version is not None:
+            etag = _etag(provider.name, listing.version, version, session_id, format)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_etag_headers(etag))
+
     try:
-        messages = provider.get_session_messages(session_id)
+        messages = await asyncio.to_thread(_cached_messages, provider, session_id)
     except Exception as e:
         logger.error("Failed to get messages for export %s: %s", session_id, e)
         raise HTTPException(status_code=500, detail="Failed to load messages")
 
-    safe_title = "".join(c if c.isalnum() or c in "-_ " else "" for c in session.title)[:50]
+    safe_title = session.title.translate(_SAFE_TITLE_TABLE)[:50]
 
     if format == "json":
-        content = session_to_json(session, messages)
-        return Response(
-            content=content,
+        return StreamingResponse(
+            _batched(iter_session_json(session, messages)),
             media_type="application/json",
-            headers={"Content-Disposition": f'attachment; filename="{safe_title}.json"'},
+            headers={
+                "Content-Disposition": f'attachment; filename="{safe_title}.json"',
+                **_etag_headers(etag),
+            },
         )
     else:
-        content = session_to_markdown(session, messages)
-        return Response(
-            content=content,
+        return StreamingResponse(
+            _batched(iter_session_markdown(session, messages)),
             media_type="text/markdown",
-            headers={"Content-Disposition": f'attachment; filename="{safe_title}.md"'},
+            headers={
+                "Content-Disposition": f'attachment; filename="{safe_title}.md"',
+                **_etag_headers(etag),
+            },
         )
-
-
-def _epoch():
-    """Return a datetime at epoch for sorting fallback."""
-    from datetime import datetime, timezone
-    return datetime(1970, 1, 1, tzinfo=timezone.utc)
@@ -1,26 +1,48 @@
 """Shared test fixtures for aichat-history."""
 
 import json
+import shutil
 import sqlite3
+from contextlib import closing
 from datetime import datetime, timezone
 
 import pytest
 
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup
+    orjson = None
 
-@pytest.fixture
-def tmp_cursor_workspace(tmp_path):
-    """Create a synthetic Cursor workspace with chat data."""
-    ws_storage = tmp_path / "workspaceStorage"
-    ws_dir = ws_storage / "abc123hash"
-    ws_dir.mkdir(parents=True)
 
-    workspace_json = {"folder": "file:///Users/testuser/dev/my-project"}
-    (ws_dir / "workspace.json").write_text(json.dumps(workspace_json), encoding="utf-8")
+def _dumps(obj) -> bytes:
+    """Serialize a fixture payload to compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def _write_fixture_db(db_path, rows):
+    """Write a Cursor state.vscdb holding rows in its ItemTable.
+
+    The database is built in memory and copied to disk in a single backup
+    pass, since providers open it by path.
+    """
+    # Autocommit mode, so the one explicit transaction below is the only one
+    with closing(sqlite3.connect(":memory:", isolation_level=None)) as mem:
+        mem.execute("BEGIN")
+        mem.execute("CREATE TABLE ItemTable (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+        mem.executemany("INSERT INTO ItemTable VALUES (?, ?)", rows)
+        mem.execute("COMMIT")
+
+        with closing(sqlite3.connect(str(db_path))) as disk:
+            disk.execute("PRAGMA synchronous = OFF")
+            mem.backup(disk)
 
-    db_path = ws_dir / "state.vscdb"
-    conn = sqlite3.connect(str(db_path))
-    conn.execute("CREATE TABLE ItemTable (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
-    conn.execute("CREATE TABLE cursorDiskKV (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+
+@pytest.fixture(scope="session")
+def _cursor_workspace_db(tmp_path_factory):
+    """Build the synthetic workspace state.vscdb once per test session."""
+    db_path = tmp_path_factory.mktemp("cursor-workspace-db") / "state.vscdb"
 
     now_ms = int(datetime(2025, 1, 15, 10, 0, 0, tzinfo=timezone.utc).timestamp() * 1000)
     later_ms = int(datetime(2025, 1, 15, 11, 0, 0, tzinfo=timezone.utc).timestamp() * 1000)
@@ -60,25 +82,36 @@ def tmp_cursor_workspace(tmp_path):
         {"unixMs": later_ms + 60000, "generationUUID": "gen-003", "type": "composer", "textDescription": "Implemented dark mode toggle with CSS variables"},
     ]
 
-    conn.execute("INSERT INTO ItemTable VALUES (?, ?)", ("composer.composerData", json.dumps(composer_data)))
-    conn.execute("INSERT INTO ItemTable VALUES (?, ?)", ("aiService.prompts", json.dumps(prompts)))
-    conn.execute("INSERT INTO ItemTable VALUES (?, ?)", ("aiService.generations", json.dumps(generations)))
-    conn.commit()
-    conn.close()
+    _write_fixture_db(db_path, [
+        ("composer.composerData", _dumps(composer_data)),
+        ("aiService.prompts", _dumps(prompts)),
+        ("aiService.generations", _dumps(generations)),
+    ])
+    return db_path
 
-    return ws_storage
+
+_CURSOR_WORKSPACE_JSON = _dumps({"folder": "file:///Users/testuser/dev/my-project"})
 
 
 @pytest.fixture
-def tmp_cursor_global(tmp_path):
-    """Create a synthetic Cursor global storage with chat data."""
-    global_dir = tmp_path / "globalStorage"
-    global_dir.mkdir(parents=True)
-    db_path = global_dir / "state.vscdb"
+def tmp_cursor_workspace(tmp_path, _cursor_workspace_db):
+    """Create a synthetic Cursor workspace with chat data."""
+    ws_storage = tmp_path / "workspaceStorage"
+    ws_dir = ws_storage / "abc123hash"
+    ws_dir.mkdir(parents=True)
+
+    (ws_dir / "workspace.json").write_bytes(_CURSOR_WORKSPACE_JSON)
+
+    # Each test gets its own copy, so tests that write to the DB stay isolated
+    shutil.copyfile(_cursor_workspace_db, ws_dir / "state.vscdb")
+
+    return ws_storage
+
 
-    conn = sqlite3.connect(str(db_path))
-    conn.execute("CREATE TABLE ItemTable (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
-    conn.execute("CREATE TABLE cursorDiskKV (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+@pytest.fixture(scope="session")
+def _cursor_global_db(tmp_path_factory):
+    """Build the synthetic global state.vscdb once per test session."""
+    db_path = tmp_path_factory.mktemp("cursor-global-db") / "state.vscdb"
 
     chatdata = {
         "tabs": [
@@ -94,17 +127,152 @@ def tmp_cursor_global(tmp_path):
         ]
     }
 
-    conn.execute("INSERT INTO ItemTable VALUES (?, ?)", ("workbench.panel.aichat.view.aichat.chatdata", json.dumps(chatdata)))
-    conn.commit()
-    conn.close()
-
+    _write_fixture_db(db_path, [
+        ("workbench.panel.aichat.view.aichat.chatdata", _dumps(chatdata)),
+    ])
     return db_path
 
 
 @pytest.fixture
-def tmp_claude_code_dir(tmp_path):
+def tmp_cursor_global(tmp_path, _cursor_global_db):
+    """Create a synthetic Cursor global storage with chat data."""
+    global_dir = tmp_path / "globalStorage"
+    global_dir.mkdir(parents=True)
+    db_path = global_dir / "state.vscdb"
+    shutil.copyfile(_cursor_global_db, db_path)
+    return db_path
+
+
+_CLAUDE_INDEX = [
+    {
+        "sessionId": "session-001",
+        "firstPrompt": "Help me refactor the auth module",
+        "summary": "Refactored auth module",
+        "messageCount": 8,
+        "created": "2025-01-20T10:00:00Z",
+        "modified": "2025-01-20T11:30:00Z",
+        "projectPath": "/Users/testuser/dev/myapp",
+    },
+    {
+        "sessionId": "session-002",
+        "firstPrompt": "Write tests for the API",
+        "summary": "API test suite",
+        "messageCount": 3,
+        "created": "2025-01-21T09:00:00Z",
+        "modified": "2025-01-21T09:45:00Z",
+        "projectPath": "/Users/testuser/dev/myapp",
+    },
+]
+
+# Realistic JSONL with all entry types
+_CLAUDE_SESSION_ENTRIES = [
+    # 1. User prompt
+    {
+        "type": "user",
+        "message": {"role": "user", "content": [{"type": "text", "text": "Help me refactor the auth module"}]},
+        "timestamp": "2025-01-20T10:00:00Z",
+        "uuid": "uuid-001",
+    },
+    # 2. Assistant text + tool_use in same entry
+    {
+        "type": "assistant",
+        "message": {"role": "assistant", "content": [
+            {"type": "text", "text": "I'll help you refactor the auth module. Let me start by reading the current code."},
+            {"type": "tool_use", "id": "toolu_001", "name": "Read", "input": {"file_path": "/src/auth.ts"}},
+        ]},
+        "timestamp": "2025-01-20T10:00:30Z",
+        "uuid": "uuid-002",
+    },
+    # 3. Tool result (appears as user type entry)
+    {
+        "type": "user",
+        "message": {"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": "toolu_001", "content": "export function authenticate(token: string) {\n  return jwt.verify(token);\n}", "is_error": False},
+        ]},
+        "timestamp": "2025-01-20T10:00:31Z",
+        "uuid": "uuid-003",
+    },
+    # 4. Assistant with thinking block
+    {
+        "type": "assistant",
+        "message": {"role": "assistant", "content": [
+            {"type": "thinking", "thinking": "I need to split this into separate functions for validation and token refresh."},
+            {"type": "text", "text": "I can see the auth module. Let me refactor it into separate concerns."},
+            {"type": "tool_use", "id": "toolu_002", "name": "Edit", "input": {"file_path": "/src/auth.ts", "new_content": "refactored code..."}},
+        ]},
+        "timestamp": "2025-01-20T10:01:00Z",
+        "uuid": "uuid-004",
+    },
+    # 5. Tool result for Edit
+    {
+        "type": "user",
+        "message": {"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": "toolu_002", "content": "File edited successfully", "is_error": False},
+        ]},
+        "timestamp": "2025-01-20T10:01:01Z",
+        "uuid": "uuid-005",
+    },
+    # 6. file-history-snapshot (should be skipped)
+    {
+        "type": "file-history-snapshot",
+        "files": [{"path": "/src/auth.ts"}],
+    },
+    # 7. User follow-up
+    {
+        "type": "human",
+        "message": {"role": "user", "content": [{"type": "text", "text": "Looks good, now split it into separate files"}]},
+        "timestamp": "2025-01-20T10:05:00Z",
+        "uuid": "uuid-006",
+    },
+    # 8. Assistant with just tool_use (no text)
+    {
+        "type": "assistant",
+        "message": {"role": "assistant", "content": [
+            {"type": "tool_use", "id": "toolu_003", "name": "Bash", "input": {"command": "mkdir -p /src/auth/", "description": "Create auth directory"}},
+        ]},
+        "timestamp": "2025-01-20T10:05:30Z",
+        "uuid": "uuid-007",
+    },
+    # 9. Progress entry (should be skipped)
+    {
+        "type": "progress",
+        "data": {"type": "hook_progress"},
+    },
+    # 10. Summary entry (should be skipped)
+    {
+        "type": "summary",
+        "summary": "Refactored auth module into separate files",
+    },
+    # 11. Queue-operation entry (should be skipped)
+    {
+        "type": "queue-operation",
+        "operation": "enqueue",
+    },
+    # 12. Tool result with image block
+    {
+        "type": "user",
+        "message": {"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": "toolu_003", "content": [
+                {"type": "text", "text": "Command output:\nDirectory created"},
+                {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": "iVBORw0KGgo="}},
+            ], "is_error": False},
+        ]},
+        "timestamp": "2025-01-20T10:05:31Z",
+        "uuid": "uuid-008",
+    },
+]
+
+# Serialized once at import; the fixture only writes bytes
+_CLAUDE_INDEX_BYTES = _dumps(_CLAUDE_INDEX)
+_CLAUDE_SESSION_BYTES = b"\n".join(_dumps(entry) for entry in _CLAUDE_SESSION_ENTRIES)
+
+
+@pytest.fixture(scope="session")
+def tmp_claude_code_dir(tmp_path_factory):
     """Create a synthetic Claude Code projects directory with realistic JSONL.
 
+    Built once per test session; tests must treat it as read-only.
+
     Includes:
     - User text messages
     - Assistant text + tool_use in same entry
@@ -112,143 +280,20 @@ def tmp_claude_code_dir(tmp_path):
     - Thinking blocks
     - file-history-snapshot (should be skipped)
     """
-    projects = tmp_path / "projects"
+    projects = tmp_path_factory.mktemp("claude-code") / "projects"
     project_dir = projects / "-Users-testuser-dev-myapp"
     project_dir.mkdir(parents=True)
 
-    index = [
-        {
-            "sessionId": "session-001",
-            "firstPrompt": "Help me refactor the auth module",
-            "summary": "Refactored auth module",
-            "messageCount": 8,
-            "created": "2025-01-20T10:00:00Z",
-            "modified": "2025-01-20T11:30:00Z",
-            "projectPath": "/Users/testuser/dev/myapp",
-        },
-        {
-            "sessionId": "session-002",
-            "firstPrompt": "Write tests for the API",
-            "summary": "API test suite",
-            "messageCount": 3,
-            "created": "2025-01-21T09:00:00Z",
-            "modified": "2025-01-21T09:45:00Z",
-            "projectPath": "/Users/testuser/dev/myapp",
-        },
-    ]
-    (project_dir / "sessions-index.json").write_text(json.dumps(index), encoding="utf-8")
-
-    # Realistic JSONL with all entry types
-    lines = [
-        # 1. User prompt
-        json.dumps({
-            "type": "user",
-            "message": {"role": "user", "content": [{"type": "text", "text": "Help me refactor the auth module"}]},
-            "timestamp": "2025-01-20T10:00:00Z",
-            "uuid": "uuid-001",
-        }),
-        # 2. Assistant text + tool_use in same entry
-        json.dumps({
-            "type": "assistant",
-            "message": {"role": "assistant", "content": [
-                {"type": "text", "text": "I'll help you refactor the auth module. Let me start by reading the current code."},
-                {"type": "tool_use", "id": "toolu_001", "name": "Read", "input": {"file_path": "/src/auth.ts"}},
-            ]},
-            "timestamp": "2025-01-20T10:00:30Z",
-            "uuid": "uuid-002",
-        }),
-        # 3. Tool result (appears as user type entry)
-        json.dumps({
-            "type": "user",
-            "message": {"role": "user", "content": [
-                {"type": "tool_result", "tool_use_id": "toolu_001", "content": "export function authenticate(token: string) {\n  return jwt.verify(token);\n}", "is_error": False},
-            ]},
-            "timestamp": "2025-01-20T10:00:31Z",
-            "uuid": "uuid-003",
-        }),
-        # 4. Assistant with thinking block
-        json.dumps({
-            "type": "assistant",
-            "message": {"role": "assistant", "content": [
-                {"type": "thinking", "thinking": "I need to split this into separate functions for validation and token refresh."},
-                {"type": "text", "text": "I can see the auth module. Let me refactor it into separate concerns."},
-                {"type": "tool_use", "id": "toolu_002", "name": "Edit", "input": {"file_path": "/src/auth.ts", "new_content": "refactored code..."}},
-            ]},
-            "timestamp": "2025-01-20T10:01:00Z",
-            "uuid": "uuid-004",
-        }),
-        # 5. Tool result for Edit
-        json.dumps({
-            "type": "user",
-            "message": {"role": "user", "content": [
-                {"type": "tool_result", "tool_use_id": "toolu_002", "content": "File edited successfully", "is_error": False},
-            ]},
-            "timestamp": "2025-01-20T10:01:01Z",
-            "uuid": "uuid-005",
-        }),
-        # 6. file-history-snapshot (should be skipped)
-        json.dumps({
-            "type": "file-history-snapshot",
-            "files": [{"path": "/src/auth.ts"}],
-        }),
-        # 7. User follow-up
-        json.dumps({
-            "type": "human",
-            "message": {"role": "user", "content": [{"type": "text", "text": "Looks good, now split it into separate files"}]},
-            "timestamp": "2025-01-20T10:05:00Z",
-            "uuid": "uuid-006",
-        }),
-        # 8. Assistant with just tool_use (no text)
-        json.dumps({
-            "type": "assistant",
-            "message": {"role": "assistant", "content": [
-                {"type": "tool_use", "id": "toolu_003", "name": "Bash", "input": {"command": "mkdir -p /src/auth/", "description": "Create auth directory"}},
-            ]},
-            "timestamp": "2025-01-20T10:05:30Z",
-            "uuid": "uuid-007",
-        }),
-        # 9. Progress entry (should be skipped)
-        json.dumps({
-            "type": "progress",
-            "data": {"type": "hook_progress"},
-        }),
-        # 10. Summary entry (should be skipped)
-        json.dumps({
-            "type": "summary",
-            "summary": "Refactored auth module into separate files",
-        }),
-        # 11. Queue-operation entry (should be skipped)
-        json.dumps({
-            "type": "queue-operation",
-            "operation": "enqueue",
-        }),
-        # 12. Tool result with image block
-        json.dumps({
-            "type": "user",
-            "message": {"role": "user", "content": [
-                {"type": "tool_result", "tool_use_id": "toolu_003", "content": [
-                    {"type": "text", "text": "Command output:\nDirectory created"},
-                    {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": "iVBORw0KGgo="}},
-                ], "is_error": False},
-            ]},
-            "timestamp": "2025-01-20T10:05:31Z",
-            "uuid": "uuid-008",
-        }),
-    ]
-    (project_dir / "session-001.jsonl").write_text("\n".join(lines), encoding="utf-8")
+    (project_dir / "sessions-index.json").write_bytes(_CLAUDE_INDEX_BYTES)
+    (project_dir / "session-001.jsonl").write_bytes(_CLAUDE_SESSION_BYTES)
 
     return projects
 
 
-@pytest.fixture
-def tmp_opencode_dir(tmp_path):
-    """Create a synthetic OpenCode v1.1+ storage directory with parts."""
-    storage = tmp_path / "storage"
-
+# OpenCode v1.1+ storage, as (path relative to storage/, payload) pairs
+_OPENCODE_FILES = [
     # Session
-    ses_dir = storage / "session" / "proj1"
-    ses_dir.mkdir(parents=True)
-    ses_data = {
+    ("session/proj1/ses_001.json", {
         "id": "ses_001",
         "version": "1.1.34",
         "title": "Debug API endpoint",
@@ -257,53 +302,34 @@ def tmp_opencode_dir(tmp_path):
             "created": int(datetime(2025, 1, 22, 8, 0, 0, tzinfo=timezone.utc).timestamp() * 1000),
             "updated": int(datetime(2025, 1, 22, 8, 30, 0, tzinfo=timezone.utc).timestamp() * 1000),
         },
-    }
-    (ses_dir / "ses_001.json").write_text(json.dumps(ses_data), encoding="utf-8")
-
+    }),
     # Messages
-    msg_dir = storage / "message" / "ses_001"
-    msg_dir.mkdir(parents=True)
-
-    msg1 = {
+    ("message/ses_001/msg_001.json", {
         "id": "msg_001",
         "sessionID": "ses_001",
         "role": "user",
         "time": {"created": int(datetime(2025, 1, 22, 8, 0, 0, tzinfo=timezone.utc).timestamp() * 1000)},
         "summary": {"title": "API 500 error investigation", "diffs": []},
-    }
-    msg2 = {
+    }),
+    ("message/ses_001/msg_002.json", {
         "id": "msg_002",
         "sessionID": "ses_001",
         "role": "assistant",
         "time": {"created": int(datetime(2025, 1, 22, 8, 0, 30, tzinfo=timezone.utc).timestamp() * 1000)},
-    }
-    msg3 = {
+    }),
+    ("message/ses_001/msg_003.json", {
         "id": "msg_003",
         "sessionID": "ses_001",
         "role": "assistant",
         "time": {"created": int(datetime(2025, 1, 22, 8, 1, 0, tzinfo=timezone.utc).timestamp() * 1000)},
-    }
-    (msg_dir / "msg_001.json").write_text(json.dumps(msg1), encoding="utf-8")
-    (msg_dir / "msg_002.json").write_text(json.dumps(msg2), encoding="utf-8")
-    (msg_dir / "msg_003.json").write_text(json.dumps(msg3), encoding="utf-8")
-
+    }),
     # Parts for msg_001 (user text)
-    prt_dir_1 = storage / "part" / "msg_001"
-    prt_dir_1.mkdir(parents=True)
-    prt1 = {"id": "prt_001", "messageID": "msg_001", "type": "text", "text": "Why is the /api/users endpoint returning 500?"}
-    (prt_dir_1 / "prt_001.json").write_text(json.dumps(prt1), encoding="utf-8")
-
+    ("part/msg_001/prt_001.json", {"id": "prt_001", "messageID": "msg_001", "type": "text", "text": "Why is the /api/users endpoint returning 500?"}),
     # Parts for msg_002 (assistant text)
-    prt_dir_2 = storage / "part" / "msg_002"
-    prt_dir_2.mkdir(parents=True)
-    prt2_text = {"id": "prt_002", "messageID": "msg_002", "type": "text", "text": "The error is in the database query. Let me check the logs."}
-    (prt_dir_2 / "prt_001.json").write_text(json.dumps(prt2_text), encoding="utf-8")
-
+    ("part/msg_002/prt_001.json", {"id": "prt_002", "messageID": "msg_002", "type": "text", "text": "The error is in the database query. Let me check the logs."}),
     # Parts for msg_003 (assistant with tool call - v1.1 format)
-    prt_dir_3 = storage / "part" / "msg_003"
-    prt_dir_3.mkdir(parents=True)
-    prt3_step = {"id": "prt_003a", "messageID": "msg_003", "type": "step-start", "snapshot": "abc123"}
-    prt3_tool = {
+    ("part/msg_003/prt_001.json", {"id": "prt_003a", "messageID": "msg_003", "type": "step-start", "snapshot": "abc123"}),
+    ("part/msg_003/prt_002.json", {
         "id": "prt_003b",
         "messageID": "msg_003",
         "type": "tool",
@@ -314,21 +340,12 @@ def tmp_opencode_dir(tmp_path):
             "output": "Found 3 matches\nsrc/db.ts:15: SELECT * FROM users WHERE id = $1",
             "metadata": {"matches": 3},
         },
-    }
-    (prt_dir_3 / "prt_001.json").write_text(json.dumps(prt3_step), encoding="utf-8")
-    (prt_dir_3 / "prt_002.json").write_text(json.dumps(prt3_tool), encoding="utf-8")
-
-    return storage
-
-
-@pytest.fixture
-def tmp_opencode_v1_dir(tmp_path):
-    """Create a synthetic OpenCode v1.0 storage directory (no parts, summary only)."""
-    storage = tmp_path / "storage"
+    }),
+]
 
-    ses_dir = storage / "session" / "proj_old"
-    ses_dir.mkdir(parents=True)
-    ses_data = {
+# OpenCode v1.0 storage: messages with summary but NO part directories
+_OPENCODE_V1_FILES = [
+    ("session/proj_old/ses_old_001.json", {
         "id": "ses_old_001",
         "version": "1.0.218",
         "title": "Build login page",
@@ -337,14 +354,8 @@ def tmp_opencode_v1_dir(tmp_path):
             "created": int(datetime(2025, 1, 10, 9, 0, 0, tzinfo=timezone.utc).timestamp() * 1000),
             "updated": int(datetime(2025, 1, 10, 10, 0, 0, tzinfo=timezone.utc).timestamp() * 1000),
         },
-    }
-    (ses_dir / "ses_old_001.json").write_text(json.dumps(ses_data), encoding="utf-8")
-
-    # Messages with summary but NO part directories
-    msg_dir = storage / "message" / "ses_old_001"
-    msg_dir.mkdir(parents=True)
-
-    msg1 = {
+    }),
+    ("message/ses_old_001/msg_old_001.json", {
         "id": "msg_old_001",
         "sessionID": "ses_old_001",
         "role": "user",
@@ -352,19 +363,55 @@ def tmp_opencode_v1_dir(tmp_path):
         "summary": {"title": "Build a login page with email and password", "diffs": []},
         "agent": "code",
         "model": {"providerID": "opencode", "modelID": "big-pickle"},
-    }
-    msg2 = {
+    }),
+    ("message/ses_old_001/msg_old_002.json", {
         "id": "msg_old_002",
         "sessionID": "ses_old_001",
         "role": "assistant",
         "time": {"created": int(datetime(2025, 1, 10, 9, 0, 30, tzinfo=timezone.utc).timestamp() * 1000)},
         "mode": "code",
         "finish": "stop",
-    }
-    (msg_dir / "msg_old_001.json").write_text(json.dumps(msg1), encoding="utf-8")
-    (msg_dir / "msg_old_002.json").write_text(json.dumps(msg2), encoding="utf-8")
+    }),
+]
+
+# Serialized once at import; the fixtures only create directories and write bytes
+_OPENCODE_FILE_BYTES = [(rel, _dumps(payload)) for rel, payload in _OPENCODE_FILES]
+_OPENCODE_V1_FILE_BYTES = [(rel, _dumps(payload)) for rel, payload in _OPENCODE_V1_FILES]
+
+
+def _write_tree(root, files):
+    """Write (relative path, bytes) pairs under root, creating each directory once."""
+    for parent in dict.fromkeys(rel.rpartition("/")[0] for rel, _ in files):
+        (root / parent).mkdir(parents=True, exist_ok=True)
+    for rel, data in files:
+        (root / rel).write_bytes(data)
+
+
+@pytest.fixture(scope="session")
+def _opencode_storage(tmp_path_factory):
+    """Build the synthetic OpenCode v1.1+ storage tree once per test session."""
+    storage = tmp_path_factory.mktemp("opencode") / "storage"
+    _write_tree(storage, _OPENCODE_FILE_BYTES)
+    return storage
+
+
+@pytest.fixture
+def tmp_opencode_dir(tmp_path, _opencode_storage):
+    """Create a synthetic OpenCode v1.1+ storage directory with parts."""
+    # Each test gets its own copy, so tests that add messages stay isolated
+    return shutil.copytree(_opencode_storage, tmp_path / "storage")
+
+
+@pytest.fixture(scope="session")
+def tmp_opencode_v1_dir(tmp_path_factory):
+    """Create a synthetic OpenCode v1.0 storage directory (no parts, summary only).
+
+    Built once per test session; tests must treat it as read-only.
+    """
+    storage = tmp_path_factory.mktemp("opencode-v1") / "storage"
+    _write_tree(storage, _OPENCODE_V1_FILE_BYTES)
 
     # Ensure part/ dir exists but has NO subdirs for these messages
-    (storage / "part").mkdir(parents=True)
+    (storage / "part").mkdir()
 
     return storage
@@ -1,205 +1,198 @@
 """Tests for the Claude Code backend."""
 
-from unittest.mock import patch
+import pytest
 
 from aichat_history.backends.claude_code import ClaudeCodeProvider
 
 
+@pytest.fixture(scope="module")
+def cc_provider(tmp_claude_code_dir):
+    """One provider over the shared Claude Code fixture for the whole module.
+
+    Tests only read through it, so its path and display-path caches can be
+    shared; tests needing other data build their own with base_path.
+    """
+    return ClaudeCodeProvider(base_path=tmp_claude_code_dir)
+
+
+@pytest.fixture(scope="module")
+def cc_session_messages(cc_provider):
+    """session-001's messages, parsed once for the module's read-only checks."""
+    return cc_provider.get_session_messages("claude:-Users-testuser-dev-myapp:session-001")
+
+
 class TestClaudeCodeProvider:
     """Tests for ClaudeCodeProvider."""
 
-    def test_is_available_with_data(self, tmp_claude_code_dir):
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            assert provider.is_available() is True
+    def test_is_available_with_data(self, cc_provider):
+        assert cc_provider.is_available() is True
 
     def test_is_available_without_data(self, tmp_path):
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_path / "nonexistent"):
-            assert provider.is_available() is False
-
-    def test_list_workspaces(self, tmp_claude_code_dir):
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            workspaces = provider.list_workspaces()
-            assert len(workspaces) == 1
-            ws = workspaces[0]
-            assert ws.display_path == "/Users/testuser/dev/myapp"
-            assert ws.source == "claude_code"
-
-    def test_list_sessions(self, tmp_claude_code_dir):
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            sessions = provider.list_sessions()
-            assert len(sessions) == 2
-
-            s1 = next(s for s in sessions if "session-001" in s.id)
-            assert s1.title == "Help me refactor the auth module"
-            assert s1.message_count == 8
-            assert s1.source == "claude_code"
-            assert s1.project_path == "/Users/testuser/dev/myapp"
-            assert s1.created is not None
-            assert s1.updated is not None
-
-            s2 = next(s for s in sessions if "session-002" in s.id)
-            assert s2.title == "Write tests for the API"
-
-    def test_list_sessions_by_workspace(self, tmp_claude_code_dir):
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            sessions = provider.list_sessions(workspace_id="-Users-testuser-dev-myapp")
-            assert len(sessions) == 2
-
-    def test_get_session_messages_returns_all_types(self, tmp_claude_code_dir):
+        provider = ClaudeCodeProvider(base_path=tmp_path / "nonexistent")
+        assert provider.is_available() is False
+
+    def test_availability_rechecked_after_ttl(self, tmp_path, monkeypatch):
+        import aichat_history.backends.claude_code as claude_backend
+
+        projects = tmp_path / "projects"
+        provider = ClaudeCodeProvider(base_path=projects)
+        assert provider.is_available() is False
+
+        projects.mkdir()
+        assert provider.is_available() is False  # still cached
+        now = claude_backend.time.monotonic()
+        monkeypatch.setattr(
+            claude_backend.time, "monotonic", lambda: now + claude_backend._AVAILABILITY_TTL + 1
+        )
+        assert provider.is_available() is True
+
+    def test_list_workspaces(self, cc_provider):
+        workspaces = cc_provider.list_workspaces()
+        assert len(workspaces) == 1
+        ws = workspaces[0]
+        assert ws.display_path == "/Users/testuser/dev/myapp"
+        assert ws.source == "claude_code"
+
+    def test_list_sessions(self, cc_provider):
+        sessions = cc_provider.list_sessions()
+        assert len(sessions) == 2
+
+        s1 = next(s for s in sessions if "session-001" in s.id)
+        assert s1.title == "Help me refactor the auth module"
+        assert s1.message_count == 8
+        assert s1.source == "claude_code"
+        assert s1.project_path == "/Users/testuser/dev/myapp"
+        assert s1.created is not None
+        assert s1.updated is not None
+
+        s2 = next(s for s in sessions if "session-002" in s.id)
+        assert s2.title == "Write tests for the API"
+
+    def test_list_sessions_by_workspace(self, cc_provider):
+        sessions = cc_provider.list_sessions(workspace_id="-Users-testuser-dev-myapp")
+        assert len(sessions) == 2
+
+    def test_get_session_messages_returns_all_types(self, cc_session_messages):
         """Verify all message types are returned: user, assistant, tool, thinking."""
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            messages = provider.get_session_messages(
-                "claude:-Users-testuser-dev-myapp:session-001"
-            )
-            roles = [m.role for m in messages]
-
-            # Should have user messages
-            assert "user" in roles
-            # Should have assistant text messages
-            assert "assistant" in roles
-            # Should have tool call messages
-            assert "tool" in roles
-            # Should have thinking blocks
-            assert "thinking" in roles
-
-    def test_user_prompts_have_content(self, tmp_claude_code_dir):
+        messages = cc_session_messages
+        roles = [m.role for m in messages]
+
+        # Should have user messages
+        assert "user" in roles
+        # Should have assistant text messages
+        assert "assistant" in roles
+        # Should have tool call messages
+        assert "tool" in roles
+        # Should have thinking blocks
+        assert "thinking" in roles
+
+    def test_user_prompts_have_content(self, cc_session_messages):
         """User text messages should have actual content."""
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            messages = provider.get_session_messages(
-                "claude:-Users-testuser-dev-myapp:session-001"
-            )
-            user_msgs = [m for m in messages if m.role == "user"]
-            assert len(user_msgs) >= 2
-            assert "refactor" in user_msgs[0].content.lower()
-            assert "split" in user_msgs[1].content.lower()
-
-    def test_assistant_text_has_content(self, tmp_claude_code_dir):
+        messages = cc_session_messages
+        user_msgs = [m for m in messages if m.role == "user"]
+        assert len(user_msgs) >= 2
+        assert "refactor" in user_msgs[0].content.lower()
+        assert "split" in user_msgs[1].content.lower()
+
+    def test_assistant_text_has_content(self, cc_session_messages):
         """Assistant text messages should have full content."""
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            messages = provider.get_session_messages(
-                "claude:-Users-testuser-dev-myapp:session-001"
-            )
-            assistant_msgs = [m for m in messages if m.role == "assistant"]
-            assert len(assistant_msgs) >= 2
-            assert "refactor" in assistant_msgs[0].content.lower()
-
-    def test_tool_use_has_metadata(self, tmp_claude_code_dir):
+        messages = cc_session_messages
+        assistant_msgs = [m for m in messages if m.role == "assistant"]
+        assert len(assistant_msgs) >= 2
+        assert "refactor" in assistant_msgs[0].content.lower()
+
+    def test_tool_use_has_metadata(self, cc_session_messages):
         """Tool call messages should have tool_name in metadata."""
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            messages = provider.get_session_messages(
-                "claude:-Users-testuser-dev-myapp:session-001"
-            )
-            tool_msgs = [m for m in messages if m.role == "tool"]
-            assert len(tool_msgs) >= 2  # Read + Edit + Bash
-
-            tool_names = [m.metadata.get("tool_name") for m in tool_msgs]
-            assert "Read" in tool_names
-            assert "Edit" in tool_names
-
-    def test_tool_results_are_separate(self, tmp_claude_code_dir):
+        messages = cc_session_messages
+        tool_msgs = [m for m in messages if m.role == "tool"]
+        assert len(tool_msgs) >= 2  # Read + Edit + Bash
+
+        tool_names = [m.metadata.get("tool_name") for m in tool_msgs]
+        assert "Read" in tool_names
+        assert "Edit" in tool_names
+
+    def test_tool_results_are_separate(self, cc_session_messages):
         """Tool results from 'user' entries should be separate tool messages."""
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            messages = provider.get_session_messages(
-                "claude:-Users-testuser-dev-myapp:session-001"
-            )
-            tool_results = [m for m in messages if m.message_type == "tool_result"]
-            assert len(tool_results) >= 2
-            # First tool result should contain the auth code
-            assert "authenticate" in tool_results[0].content or "File edited" in tool_results[1].content
-
-    def test_thinking_blocks_extracted(self, tmp_claude_code_dir):
+        messages = cc_session_messages
+        tool_results = [m for m in messages if m.message_type == "tool_result"]
+        assert len(tool_results) >= 2
+        # First tool result should contain the auth code
+        assert "authenticate" in tool_results[0].content or "File edited" in tool_results[1].content
+
+    def test_thinking_blocks_extracted(self, cc_session_messages):
         """Thinking blocks should be extracted as separate messages."""
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            messages = provider.get_session_messages(
-                "claude:-Users-testuser-dev-myapp:session-001"
-            )
-            thinking_msgs = [m for m in messages if m.role == "thinking"]
-            assert len(thinking_msgs) >= 1
-            assert "split" in thinking_msgs[0].content.lower() or "validation" in thinking_msgs[0].content.lower()
-
-    def test_skipped_entries(self, tmp_claude_code_dir):
+        messages = cc_session_messages
+        thinking_msgs = [m for m in messages if m.role == "thinking"]
+        assert len(thinking_msgs) >= 1
+        assert "split" in thinking_msgs[0].content.lower() or "validation" in thinking_msgs[0].content.lower()
+
+    def test_skipped_entries(self, cc_session_messages):
         """file-history-snapshot and progress entries should be skipped."""
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            messages = provider.get_session_messages(
-                "claude:-Users-testuser-dev-myapp:session-001"
-            )
-            # No message should contain snapshot or progress data
-            for m in messages:
-                assert m.message_type != "file-history-snapshot"
-                assert "progress" not in m.content.lower() or m.role != "system"
-
-    def test_message_count_is_comprehensive(self, tmp_claude_code_dir):
+        messages = cc_session_messages
+        # No message should contain snapshot or progress data
+        for m in messages:
+            assert m.message_type != "file-history-snapshot"
+            assert "progress" not in m.content.lower() or m.role != "system"
+
+    def test_message_count_is_comprehensive(self, cc_session_messages):
         """The total number of messages should reflect all content blocks."""
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            messages = provider.get_session_messages(
-                "claude:-Users-testuser-dev-myapp:session-001"
-            )
-            # From our fixture:
-            # Line 1: user text -> 1 msg
-            # Line 2: assistant text + tool_use -> 2 msgs
-            # Line 3: tool_result -> 1 msg
-            # Line 4: thinking + text + tool_use -> 3 msgs
-            # Line 5: tool_result -> 1 msg
-            # Line 6: file-history-snapshot -> skipped
-            # Line 7: user text -> 1 msg
-            # Line 8: tool_use only -> 1 msg
-            # Line 9: progress -> skipped
-            # Line 10: summary -> skipped
-            # Line 11: queue-operation -> skipped
-            # Line 12: tool_result with image -> 1 msg
-            # Total: 11 messages
-            assert len(messages) == 11
-
-    def test_summary_and_queue_entries_skipped(self, tmp_claude_code_dir):
+        messages = cc_session_messages
+        # From our fixture:
+        # Line 1: user text -> 1 msg
+        # Line 2: assistant text + tool_use -> 2 msgs
+        # Line 3: tool_result -> 1 msg
+        # Line 4: thinking + text + tool_use -> 3 msgs
+        # Line 5: tool_result -> 1 msg
+        # Line 6: file-history-snapshot -> skipped
+        # Line 7: user text -> 1 msg
+        # Line 8: tool_use only -> 1 msg
+        # Line 9: progress -> skipped
+        # Line 10: summary -> skipped
+        # Line 11: queue-operation -> skipped
+        # Line 12: tool_result with image -> 1 msg
+        # Total: 11 messages
+        assert len(messages) == 11
+
+    def test_summary_and_queue_entries_skipped(self, cc_session_messages):
         """summary and queue-operation entries should be skipped."""
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            messages = provider.get_session_messages(
-                "claude:-Users-testuser-dev-myapp:session-001"
-            )
-            for m in messages:
-                assert "Refactored auth module into separate" not in m.content
-                assert "enqueue" not in m.content
-
-    def test_tool_result_with_image_block(self, tmp_claude_code_dir):
+        messages = cc_session_messages
+        for m in messages:
+            assert "Refactored auth module into separate" not in m.content
+            assert "enqueue" not in m.content
+
+    def test_tool_result_with_image_block(self, cc_session_messages):
         """Tool results with image blocks should show [Image] placeholder."""
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            messages = provider.get_session_messages(
-                "claude:-Users-testuser-dev-myapp:session-001"
-            )
-            # Last message is the tool result with image
-            img_msg = messages[-1]
-            assert img_msg.message_type == "tool_result"
-            assert "Directory created" in img_msg.content
-            assert "[Image]" in img_msg.content
-            # Should NOT contain base64 data
-            assert "iVBORw0KGgo" not in img_msg.content
-
-    def test_get_session_messages_invalid_id(self, tmp_claude_code_dir):
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            messages = provider.get_session_messages("invalid")
-            assert messages == []
-
-    def test_get_session_messages_nonexistent(self, tmp_claude_code_dir):
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_claude_code_dir):
-            messages = provider.get_session_messages("claude:fake:nonexistent")
-            assert messages == []
+        messages = cc_session_messages
+        # Last message is the tool result with image
+        img_msg = messages[-1]
+        assert img_msg.message_type == "tool_result"
+        assert "Directory created" in img_msg.content
+        assert "[Image]" in img_msg.content
+        # Should NOT contain base64 data
+        assert "iVBORw0KGgo" not in img_msg.content
+
+    def test_mapped_and_buffered_parsing_agree(self, cc_provider, cc_session_messages, monkeypatch):
+        import aichat_history.backends.claude_code as claude_backend
+
+        monkeypatch.setattr(claude_backend, "_MMAP_MIN_SIZE", 0)
+        monkeypatch.setattr(claude_backend, "_MMAP_SETTLE_SECONDS", float("-inf"))
+        session_id = "claude:-Users-testuser-dev-myapp:session-001"
+        assert cc_provider.get_session_messages(session_id) == cc_session_messages
+
+        # A file truncated between fstat() and mmap() falls back to a read
+        def fail(*args, **kwargs):
+            raise ValueError("cannot mmap an empty file")
+
+        monkeypatch.setattr(claude_backend.mmap, "mmap", fail)
+        assert cc_provider.get_session_messages(session_id) == cc_session_messages
+
+    def test_get_session_messages_invalid_id(self, cc_provider):
+        messages = cc_provider.get_session_messages("invalid")
+        assert messages == []
+
+    def test_get_session_messages_nonexistent(self, cc_provider):
+        messages = cc_provider.get_session_messages("claude:fake:nonexistent")
+        assert messages == []
 
     def test_display_path_derivation(self, tmp_path):
         """Test that folder names are correctly derived to paths."""
@@ -207,8 +200,94 @@ class TestClaudeCodeProvider:
         project_dir = projects / "-Users-alice-projects-webapp"
         project_dir.mkdir(parents=True)
 
-        provider = ClaudeCodeProvider()
-        with patch.object(provider, "get_base_path", return_value=projects):
-            workspaces = provider.list_workspaces()
-            assert len(workspaces) == 1
-            assert workspaces[0].display_path == "/Users/alice/projects/webapp"
+        provider = ClaudeCodeProvider(base_path=projects)
+        workspaces = provider.list_workspaces()
+        assert len(workspaces) == 1
+        assert workspaces[0].display_path == "/Users/alice/projects/webapp"
+
+    def test_invalid_utf8_lines_are_skipped(self, tmp_path):
+        """A line that isn't UTF-8 is skipped whichever JSON decoder is active."""
+        projects = tmp_path / "projects"
+        project_dir = projects / "-Users-alice-projects-cli"
+        project_dir.mkdir(parents=True)
+        lines = [
+            b'{"type": "user", "message": {"role": "user", "content": "caf\xe9 \xff"}}',
+            b'{"type": "user", "message": {"role": "user", "content": "Add a --verbose flag"}}',
+            b'{"type": "assistant", "message": {"role": "assistant", "content": "Done."}}',
+        ]
+        (project_dir / "session-abc.jsonl").write_bytes(b"\n".join(lines))
+
+        provider = ClaudeCodeProvider(base_path=projects)
+        sessions = provider.list_sessions()
+        assert len(sessions) == 1
+        assert sessions[0].message_count == 3
+
+        messages = provider.get_session_messages("claude:-Users-alice-projects-cli:session-abc")
+        assert [m.content for m in messages] == ["Add a --verbose flag", "Done."]
+
+    def test_display_path_follows_index_written_later(self, tmp_path):
+        """A path derived before the index existed is replaced by projectPath."""
+        projects = tmp_path / "projects"
+        project_dir = projects / "-Users-alice-my-app"
+        project_dir.mkdir(parents=True)
+
+        provider = ClaudeCodeProvider(base_path=projects)
+        assert provider.list_workspaces()[0].display_path == "/Users/alice/my/app"
+
+        (project_dir / "sessions-index.json").write_text(
+            '[{"sessionId": "s1", "projectPath": "/Users/alice/my-app"}]', encoding="utf-8"
+        )
+        assert provider.list_workspaces()[0].display_path == "/Users/alice/my-app"
+
+    def test_list_sessions_without_index(self, tmp_path):
+        """Projects without sessions-index.json fall back to scanning JSONL files."""
+        projects = tmp_path / "projects"
+        project_dir = projects / "-Users-alice-projects-cli"
+        project_dir.mkdir(parents=True)
+        lines = [
+            '{"type": "file-history-snapshot", "files": []}',
+            "",
+            '{"type": "user", "message": {"role": "user", "content": "Add a --verbose flag"}}',
+            '{"type": "assistant", "message": {"role": "assistant", "content": "Done."}}',
+        ]
+        (project_dir / "session-abc.jsonl").write_text("\n".join(lines), encoding="utf-8")
+        (project_dir / "notes.txt").write_text("not a session", encoding="utf-8")
+
+        provider = ClaudeCodeProvider(base_path=projects)
+        sessions = provider.list_sessions()
+        assert len(sessions) == 1
+        s = sessions[0]
+        assert s.id == "claude:-Users-alice-projects-cli:session-abc"
+        assert s.title == "Add a --verbose flag"
+        assert s.message_count == 4
+        assert s.project_path == "/Users/alice/projects/cli"
+
+    def test_data_version_tracks_index_less_jsonl(self, tmp_path):
+        projects = tmp_path / "projects"
+        project_dir = projects / "-Users-alice-projects-cli"
+        project_dir.mkdir(parents=True)
+        jsonl = project_dir / "session-abc.jsonl"
+        jsonl.write_text('{"type": "user", "message": {"content": "hi"}}\n', encoding="utf-8")
+
+        provider = ClaudeCodeProvider(base_path=projects)
+        before = provider.data_version()
+        assert provider.data_version() == before
+        with jsonl.open("a", encoding="utf-8") as f:
+            f.write('{"type": "assistant", "message": {"content": "hello"}}\n')
+        assert provider.data_version() != before
+
+    def test_session_version_tracks_jsonl(self, tmp_path):
+        projects = tmp_path / "projects"
+        project_dir = projects / "-Users-alice-projects-cli"
+        project_dir.mkdir(parents=True)
+        jsonl = project_dir / "session-abc.jsonl"
+        jsonl.write_text('{"type": "user", "message": {"content": "hi"}}\n', encoding="utf-8")
+
+        provider = ClaudeCodeProvider(base_path=projects)
+        session_id = "claude:-Users-alice-projects-cli:session-abc"
+        before = provider.session_version(session_id)
+        assert before is not None
+        assert provider.session_version("claude:-Users-alice-projects-cli:missing") is None
+        with jsonl.open("a", encoding="utf-8") as f:
+            f.write('{"type": "assistant", "message": {"content": "hello"}}\n')
+        assert provider.session_version(session_id) != before
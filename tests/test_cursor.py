@@ -1,7 +1,10 @@
 """Tests for the Cursor backend."""
 
+from contextlib import closing
 from unittest.mock import patch
 
+import pytest
+
 from aichat_history.backends.cursor import CursorProvider
 
 
@@ -9,83 +12,75 @@ class TestCursorProvider:
     """Tests for CursorProvider."""
 
     def test_is_available_with_data(self, tmp_cursor_workspace):
-        provider = CursorProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_cursor_workspace):
-            assert provider.is_available() is True
+        provider = CursorProvider(base_path=tmp_cursor_workspace)
+        assert provider.is_available() is True
 
     def test_is_available_without_data(self, tmp_path):
-        provider = CursorProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_path / "nonexistent"):
-            assert provider.is_available() is False
+        provider = CursorProvider(base_path=tmp_path / "nonexistent")
+        assert provider.is_available() is False
 
     def test_list_workspaces(self, tmp_cursor_workspace):
-        provider = CursorProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_cursor_workspace):
-            workspaces = provider.list_workspaces()
-            assert len(workspaces) == 1
-            ws = workspaces[0]
-            assert ws.id == "abc123hash"
-            assert ws.display_path == "/Users/testuser/dev/my-project"
-            assert ws.source == "cursor"
-
-    def test_list_sessions(self, tmp_cursor_workspace, tmp_cursor_global):
-        provider = CursorProvider()
-        with (
-            patch.object(provider, "get_base_path", return_value=tmp_cursor_workspace),
-            patch("aichat_history.backends.cursor.get_cursor_global_path", return_value=tmp_cursor_global),
-        ):
-            sessions = provider.list_sessions()
-            # 2 workspace sessions + 1 global session
-            assert len(sessions) == 3
-
-            # Check workspace sessions
-            ws_sessions = [s for s in sessions if s.workspace_id != "global"]
-            assert len(ws_sessions) == 2
-
-            session1 = next(s for s in ws_sessions if "comp-uuid-001" in s.id)
-            assert session1.title == "Fix auth bug"
-            assert session1.source == "cursor"
-            assert session1.project_path == "/Users/testuser/dev/my-project"
-            assert session1.created is not None
-
-            session2 = next(s for s in ws_sessions if "comp-uuid-002" in s.id)
-            assert session2.title == "Add dark mode"
-
-            # Check global session
-            global_sessions = [s for s in sessions if s.workspace_id == "global"]
-            assert len(global_sessions) == 1
-            assert global_sessions[0].title == "What is Python?"
-            assert global_sessions[0].message_count == 4
-
-    def test_list_sessions_by_workspace(self, tmp_cursor_workspace, tmp_cursor_global):
-        provider = CursorProvider()
-        with (
-            patch.object(provider, "get_base_path", return_value=tmp_cursor_workspace),
-            patch("aichat_history.backends.cursor.get_cursor_global_path", return_value=tmp_cursor_global),
-        ):
-            sessions = provider.list_sessions(workspace_id="abc123hash")
-            # Only workspace sessions (global still included from _read_global_sessions)
-            ws_sessions = [s for s in sessions if s.workspace_id == "abc123hash"]
-            assert len(ws_sessions) == 2
+        provider = CursorProvider(base_path=tmp_cursor_workspace)
+        workspaces = provider.list_workspaces()
+        assert len(workspaces) == 1
+        ws = workspaces[0]
+        assert ws.id == "abc123hash"
+        assert ws.display_path == "/Users/testuser/dev/my-project"
+        assert ws.source == "cursor"
+
+    def test_list_sessions(self, tmp_cursor_workspace, tmp_cursor_global, monkeypatch):
+        provider = CursorProvider(base_path=tmp_cursor_workspace)
+        monkeypatch.setattr("aichat_history.backends.cursor.get_cursor_global_path", lambda: tmp_cursor_global)
+        sessions = provider.list_sessions()
+        # 2 workspace sessions + 1 global session
+        assert len(sessions) == 3
+
+        # Check workspace sessions
+        ws_sessions = [s for s in sessions if s.workspace_id != "global"]
+        assert len(ws_sessions) == 2
+
+        session1 = next(s for s in ws_sessions if "comp-uuid-001" in s.id)
+        assert session1.title == "Fix auth bug"
+        assert session1.source == "cursor"
+        assert session1.project_path == "/Users/testuser/dev/my-project"
+        assert session1.created is not None
+        assert session1.message_count == 2
+
+        session2 = next(s for s in ws_sessions if "comp-uuid-002" in s.id)
+        assert session2.title == "Add dark mode"
+        assert session2.message_count == 1
+
+        # Check global session
+        global_sessions = [s for s in sessions if s.workspace_id == "global"]
+        assert len(global_sessions) == 1
+        assert global_sessions[0].title == "What is Python?"
+        assert global_sessions[0].message_count == 4
+
+    def test_list_sessions_by_workspace(self, tmp_cursor_workspace, tmp_cursor_global, monkeypatch):
+        provider = CursorProvider(base_path=tmp_cursor_workspace)
+        monkeypatch.setattr("aichat_history.backends.cursor.get_cursor_global_path", lambda: tmp_cursor_global)
+        sessions = provider.list_sessions(workspace_id="abc123hash")
+        # Only workspace sessions (global still included from _read_global_sessions)
+        ws_sessions = [s for s in sessions if s.workspace_id == "abc123hash"]
+        assert len(ws_sessions) == 2
 
     def test_get_session_messages_workspace(self, tmp_cursor_workspace):
+        provider = CursorProvider(base_path=tmp_cursor_workspace)
+        messages = provider.get_session_messages("cursor:abc123hash:comp-uuid-001")
+        assert len(messages) > 0
+        # Should have user prompts
+        user_msgs = [m for m in messages if m.role == "user"]
+        assert len(user_msgs) > 0
+        assert "auth" in user_msgs[0].content.lower() or "login" in user_msgs[0].content.lower()
+
+    def test_get_session_messages_global(self, tmp_cursor_global, monkeypatch):
         provider = CursorProvider()
-        with patch.object(provider, "get_base_path", return_value=tmp_cursor_workspace):
-            messages = provider.get_session_messages("cursor:abc123hash:comp-uuid-001")
-            assert len(messages) > 0
-            # Should have user prompts
-            user_msgs = [m for m in messages if m.role == "user"]
-            assert len(user_msgs) > 0
-            assert "auth" in user_msgs[0].content.lower() or "login" in user_msgs[0].content.lower()
-
-    def test_get_session_messages_global(self, tmp_cursor_global):
-        provider = CursorProvider()
-        with patch("aichat_history.backends.cursor.get_cursor_global_path", return_value=tmp_cursor_global):
-            messages = provider.get_session_messages("cursor:global:global-tab-001")
-            assert len(messages) == 4
-            assert messages[0].role == "user"
-            assert messages[0].content == "What is Python?"
-            assert messages[1].role == "assistant"
+        monkeypatch.setattr("aichat_history.backends.cursor.get_cursor_global_path", lambda: tmp_cursor_global)
+        messages = provider.get_session_messages("cursor:global:global-tab-001")
+        assert len(messages) == 4
+        assert messages[0].role == "user"
+        assert messages[0].content == "What is Python?"
+        assert messages[1].role == "assistant"
 
     def test_get_session_messages_invalid_id(self):
         provider = CursorProvider()
@@ -102,13 +97,190 @@ class TestCursorProvider:
         # Create DB without composerData
         import sqlite3
         db_path = ws_dir / "state.vscdb"
-        conn = sqlite3.connect(str(db_path))
-        conn.execute("CREATE TABLE ItemTable (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
-        conn.execute("CREATE TABLE cursorDiskKV (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
-        conn.commit()
-        conn.close()
+        with closing(sqlite3.connect(str(db_path))) as conn:
+            conn.execute("CREATE TABLE ItemTable (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+            conn.execute("CREATE TABLE cursorDiskKV (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+
+        provider = CursorProvider(base_path=ws_storage)
+        workspaces = provider.list_workspaces()
+        assert len(workspaces) == 0
+
+    def test_connection_reused_and_sees_new_writes(self, tmp_cursor_workspace):
+        """The cached read-only connection must not serve stale data."""
+        import json
+        import sqlite3
+
+        db_path = tmp_cursor_workspace / "abc123hash" / "state.vscdb"
+        provider = CursorProvider()
+        assert provider._query_item_table(db_path, "aiService.prompts") is not None
+        with provider._connection(db_path) as conn:
+            pass
+
+        with closing(sqlite3.connect(str(db_path))) as writer, writer:
+            writer.execute(
+                "INSERT INTO ItemTable VALUES (?, ?)",
+                ("aiService.prompts", json.dumps([{"text": "Updated prompt"}])),
+            )
+
+        assert "Updated prompt" in provider._query_item_table(db_path, "aiService.prompts")
+        with provider._connection(db_path) as again:
+            assert again is conn
+
+        provider.close()
+        assert provider._conns == {}
+
+    def test_connection_opened_outside_lock(self, tmp_cursor_workspace, monkeypatch):
+        import sqlite3
+
+        import aichat_history.backends.cursor as cursor_backend
+
+        db_path = tmp_cursor_workspace / "abc123hash" / "state.vscdb"
+        provider = CursorProvider()
+        real_open = cursor_backend._open_db
+        opened = []
+
+        def open_db(path):
+            assert not provider._conns_lock.locked()
+            if not opened:
+                # Another thread caches the same database in the meantime
+                opened.append(None)
+                with provider._connection(path):
+                    pass
+            conn = real_open(path)
+            opened.append(conn)
+            return conn
+
+        monkeypatch.setattr(cursor_backend, "_open_db", open_db)
+        with provider._connection(db_path) as conn:
+            assert conn is opened[1]
+        # The loser of the race is closed rather than cached
+        with pytest.raises(sqlite3.ProgrammingError):
+            opened[2].execute("SELECT 1")
+        assert len(provider._conns) == 1
+        provider.close()
+
+    def test_blob_values_with_invalid_utf8_still_parse(self, tmp_cursor_workspace):
+        import sqlite3
+
+        db_path = tmp_cursor_workspace / "abc123hash" / "state.vscdb"
+        with closing(sqlite3.connect(str(db_path))) as writer, writer:
+            writer.execute(
+                "INSERT INTO ItemTable VALUES (?, ?)",
+                ("aiService.prompts", b'[{"text": "caf\xe9 bug"}]'),
+            )
+
+        provider = CursorProvider()
+        raw = provider._query_item_table(db_path, "aiService.prompts")
+        assert isinstance(raw, bytes)
+        data = provider._load_workspace_data(db_path)
+        assert data.prompts == ["caf\ufffd bug"]
+
+    def test_connection_cache_is_bounded(self, tmp_path, monkeypatch):
+        import sqlite3
+
+        monkeypatch.setattr("aichat_history.backends.cursor._MAX_CONNS", 2)
+        db_paths = []
+        for name in ("a", "b", "c"):
+            db_path = tmp_path / f"{name}.vscdb"
+            with closing(sqlite3.connect(str(db_path))) as conn:
+                conn.execute("CREATE TABLE ItemTable (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+            db_paths.append(db_path)
+
+        provider = CursorProvider()
+        with provider._connection(db_paths[0]) as busy:
+            provider._query_item_table(db_paths[1], "k")
+            provider._query_item_table(db_paths[2], "k")
+            assert list(provider._conns) == db_paths[1:]
+            # Evicted while in use: stays open until released
+            assert busy.execute("SELECT 1").fetchall() == [(1,)]
+        with pytest.raises(sqlite3.ProgrammingError):
+            busy.execute("SELECT 1")
+
+        # An idle connection is closed as soon as it is evicted
+        idle = provider._conns[db_paths[1]].conn
+        provider._query_item_table(db_paths[0], "k")
+        with pytest.raises(sqlite3.ProgrammingError):
+            idle.execute("SELECT 1")
+        provider.close()
+
+    def test_per_database_caches_are_bounded(self, tmp_path, monkeypatch):
+        import json
+        import sqlite3
+
+        monkeypatch.setattr("aichat_history.backends.cursor._MAX_CONNS", 2)
+        db_paths = []
+        for name in ("a", "b", "c"):
+            db_path = tmp_path / f"{name}.vscdb"
+            with closing(sqlite3.connect(str(db_path))) as conn, conn:
+                conn.execute("CREATE TABLE ItemTable (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+                conn.execute(
+                    "INSERT INTO ItemTable VALUES (?, ?)",
+                    ("composer.composerData", json.dumps({"allComposers": [{"composerId": name}]})),
+                )
+            db_paths.append(db_path)
 
         provider = CursorProvider()
-        with patch.object(provider, "get_base_path", return_value=ws_storage):
-            workspaces = provider.list_workspaces()
-            assert len(workspaces) == 0
+        for db_path in db_paths:
+            assert provider._load_workspace_data(db_path) is not None
+        assert len(provider._workspace_data) == 2
+        assert db_paths[0] not in provider._workspace_data
+        for db_path in db_paths:
+            assert provider._has_chat_data(db_path) is True
+        assert len(provider._has_chat_cache) == 2
+        assert db_paths[0] not in provider._has_chat_cache
+        provider.close()
+
+    def test_workspace_data_cached_until_db_changes(self, tmp_cursor_workspace):
+        import json
+        import os
+        import sqlite3
+
+        db_path = tmp_cursor_workspace / "abc123hash" / "state.vscdb"
+        provider = CursorProvider()
+        first = provider._load_workspace_data(db_path)
+        assert first is not None
+        assert provider._load_workspace_data(db_path) is first
+        assert "comp-uuid-002" in first.composers_by_id
+
+        with closing(sqlite3.connect(str(db_path))) as writer, writer:
+            writer.execute(
+                "INSERT INTO ItemTable VALUES (?, ?)",
+                ("composer.composerData", json.dumps({"allComposers": [{"composerId": "only"}]})),
+            )
+        # Guarantee a new mtime even on filesystems with coarse timestamps
+        st = os.stat(db_path)
+        os.utime(db_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+        second = provider._load_workspace_data(db_path)
+        assert second is not first
+        assert list(second.composers_by_id) == ["only"]
+
+    def test_has_chat_data_cached_for_unchanged_db(self, tmp_cursor_workspace):
+        db_path = tmp_cursor_workspace / "abc123hash" / "state.vscdb"
+        provider = CursorProvider()
+        assert provider._has_chat_data(db_path) is True
+        with patch.object(provider, "_connection", side_effect=AssertionError("re-probed")):
+            assert provider._has_chat_data(db_path) is True
+
+    def test_global_tabs_decoded_once(self, tmp_cursor_global, monkeypatch):
+        provider = CursorProvider()
+        monkeypatch.setattr("aichat_history.backends.cursor.get_cursor_global_path", lambda: tmp_cursor_global)
+        assert len(provider._read_global_sessions()) == 1
+        with patch.object(provider, "_query_item_table", side_effect=AssertionError("re-read")):
+            messages = provider.get_session_messages("cursor:global:global-tab-001")
+            assert len(messages) == 4
+            assert provider.get_session_messages("cursor:global:missing") == []
+
+    def test_data_version_changes_with_database(self, tmp_cursor_workspace, tmp_cursor_global, monkeypatch):
+        import os
+
+        provider = CursorProvider(base_path=tmp_cursor_workspace)
+        monkeypatch.setattr("aichat_history.backends.cursor.get_cursor_global_path", lambda: tmp_cursor_global)
+        before = provider.data_version()
+        assert before is not None
+        assert provider.data_version() == before
+
+        db_path = tmp_cursor_workspace / "abc123hash" / "state.vscdb"
+        st = os.stat(db_path)
+        os.utime(db_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        assert provider.data_version() != before
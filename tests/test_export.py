@@ -7,7 +7,7 @@ import pytest
 from httpx import ASGITransport, AsyncClient
 
 from aichat_history.core import Message, Session
-from aichat_history.export import session_to_json, session_to_markdown
+from aichat_history.export import iter_session_json, session_to_json, session_to_markdown
 from aichat_history.server import app
 
 
@@ -131,23 +131,48 @@ class TestJsonExport:
         assert len(data["messages"]) == 0
         assert data["session"]["title"] == "Fix authentication bug"
 
+    def test_streamed_chunks_match_single_dump(self, sample_session, sample_messages):
+        sample_messages[0].metadata = {"tool_name": "grep", "args": {"pattern": "auth", "paths": []}}
+        chunks = list(iter_session_json(sample_session, sample_messages))
+        assert len(chunks) == 1 + len(sample_messages)
+        expected = {
+            "session": {
+                "id": sample_session.id,
+                "title": sample_session.title,
+                "source": sample_session.source,
+                "project_path": sample_session.project_path,
+                "message_count": sample_session.message_count,
+                "created": sample_session.created.isoformat(),
+                "updated": sample_session.updated.isoformat(),
+            },
+            "messages": [
+                {
+                    "role": m.role,
+                    "content": m.content,
+                    "timestamp": m.timestamp.isoformat(),
+                    "message_type": m.message_type,
+                    "metadata": m.metadata,
+                }
+                for m in sample_messages
+            ],
+        }
+        assert "".join(chunks) == json.dumps(expected, indent=2, ensure_ascii=False)
+
 
 @pytest.fixture(autouse=True)
 def reset_provider_cache():
     import aichat_history.server as srv
-    srv._providers = None
+    srv._clear_caches()
     yield
-    srv._providers = None
+    srv._clear_caches()
 
 
-@pytest.mark.asyncio
 async def test_export_md_endpoint(tmp_cursor_workspace, tmp_cursor_global):
     """Test the /api/export endpoint returns markdown."""
     from unittest.mock import patch
     from aichat_history.backends.cursor import CursorProvider
 
-    provider = CursorProvider()
-    provider.get_base_path = lambda: tmp_cursor_workspace
+    provider = CursorProvider(base_path=tmp_cursor_workspace)
     provider.is_available = lambda: True
 
     with (
@@ -170,14 +195,12 @@ async def test_export_md_endpoint(tmp_cursor_workspace, tmp_cursor_global):
             assert len(resp.text) > 0
 
 
-@pytest.mark.asyncio
 async def test_export_json_endpoint(tmp_cursor_workspace, tmp_cursor_global):
     """Test the /api/export endpoint returns JSON."""
     from unittest.mock import patch
     from aichat_history.backends.cursor import CursorProvider
 
-    provider = CursorProvider()
-    provider.get_base_path = lambda: tmp_cursor_workspace
+    provider = CursorProvider(base_path=tmp_cursor_workspace)
     provider.is_available = lambda: True
 
     with (
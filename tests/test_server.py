@@ -1,172 +1,335 @@
 """Tests for the FastAPI server."""
 
+import os
+import shutil
 from unittest.mock import patch
 
 import pytest
 from httpx import ASGITransport, AsyncClient
 
+import aichat_history.backends.cursor as cursor_backend
+import aichat_history.server as srv
 from aichat_history.backends.claude_code import ClaudeCodeProvider
 from aichat_history.backends.cursor import CursorProvider
 from aichat_history.backends.opencode import OpenCodeProvider
-from aichat_history.server import app, _providers
+from aichat_history.core import Session
+from aichat_history.server import app
 
 
 @pytest.fixture(autouse=True)
 def reset_provider_cache():
     """Reset the provider cache before each test."""
-    import aichat_history.server as srv
-    srv._providers = None
+    srv._clear_caches()
     yield
-    srv._providers = None
+    srv._clear_caches()
 
 
 @pytest.fixture
 def cursor_provider(tmp_cursor_workspace, tmp_cursor_global):
     """Create a CursorProvider pointed at test fixtures."""
-    provider = CursorProvider()
-    original_base = provider.get_base_path
-    original_global = None
+    return CursorProvider(base_path=tmp_cursor_workspace)
 
-    # Patch the base path
-    provider.get_base_path = lambda: tmp_cursor_workspace
-    provider.is_available = lambda: True
-    return provider
 
+@pytest.fixture
+def patched_providers(monkeypatch, cursor_provider, tmp_cursor_global):
+    """Serve only cursor_provider, with its global DB at tmp_cursor_global."""
+    monkeypatch.setattr(srv, "get_available_providers", lambda: [cursor_provider])
+    monkeypatch.setattr(cursor_backend, "get_cursor_global_path", lambda: tmp_cursor_global)
 
-@pytest.mark.asyncio
-async def test_get_sources(cursor_provider):
-    with patch("aichat_history.server.get_available_providers", return_value=[cursor_provider]):
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as client:
-            resp = await client.get("/api/sources")
-            assert resp.status_code == 200
-            data = resp.json()
-            assert "cursor" in data
-
-
-@pytest.mark.asyncio
-async def test_get_sessions(cursor_provider, tmp_cursor_global):
-    with (
-        patch("aichat_history.server.get_available_providers", return_value=[cursor_provider]),
-        patch("aichat_history.backends.cursor.get_cursor_global_path", return_value=tmp_cursor_global),
-    ):
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as client:
-            resp = await client.get("/api/sessions")
-            assert resp.status_code == 200
-            data = resp.json()
-            assert "sessions" in data
-            assert "total" in data
-            assert data["total"] > 0
-            # Each session should have expected fields
-            for session in data["sessions"]:
-                assert "id" in session
-                assert "title" in session
-                assert "source" in session
-
-
-@pytest.mark.asyncio
-async def test_get_sessions_with_search(cursor_provider, tmp_cursor_global):
-    with (
-        patch("aichat_history.server.get_available_providers", return_value=[cursor_provider]),
-        patch("aichat_history.backends.cursor.get_cursor_global_path", return_value=tmp_cursor_global),
-    ):
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as client:
-            resp = await client.get("/api/sessions?search=auth")
-            assert resp.status_code == 200
-            data = resp.json()
-            # Should find "Fix auth bug" session
-            assert data["total"] >= 1
-            titles = [s["title"] for s in data["sessions"]]
-            assert any("auth" in t.lower() for t in titles)
-
-
-@pytest.mark.asyncio
-async def test_get_session_messages(cursor_provider, tmp_cursor_global):
-    with (
-        patch("aichat_history.server.get_available_providers", return_value=[cursor_provider]),
-        patch("aichat_history.backends.cursor.get_cursor_global_path", return_value=tmp_cursor_global),
-    ):
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as client:
-            # Get a session first
-            resp = await client.get("/api/sessions")
-            sessions = resp.json()["sessions"]
-            assert len(sessions) > 0
-
-            # Get messages for the first session
-            session_id = sessions[0]["id"]
-            resp = await client.get(f"/api/session/{session_id}")
-            assert resp.status_code == 200
-            data = resp.json()
-            assert "messages" in data
-            assert "session_id" in data
-
-
-@pytest.mark.asyncio
-async def test_get_session_not_found():
-    with patch("aichat_history.server.get_available_providers", return_value=[]):
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as client:
-            resp = await client.get("/api/session/cursor:nonexistent:fake")
-            assert resp.status_code == 404
 
+async def test_get_sources(cursor_provider, monkeypatch):
+    monkeypatch.setattr(srv, "get_available_providers", lambda: [cursor_provider])
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/api/sources")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert "cursor" in data
 
-@pytest.mark.asyncio
-async def test_index_page():
-    with patch("aichat_history.server.get_available_providers", return_value=[]):
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as client:
-            resp = await client.get("/")
-            assert resp.status_code == 200
-            assert "aichat-history" in resp.text
+
+async def test_get_sessions(patched_providers):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/api/sessions")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert "sessions" in data
+        assert "total" in data
+        assert data["total"] > 0
+        # Each session should have expected fields
+        for session in data["sessions"]:
+            assert "id" in session
+            assert "title" in session
+            assert "source" in session
+
+
+async def test_get_sessions_with_search(patched_providers):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/api/sessions?search=auth")
+        assert resp.status_code == 200
+        data = resp.json()
+        # Should find "Fix auth bug" session
+        assert data["total"] >= 1
+        assert any("auth" in s["title"].lower() for s in data["sessions"])
+
+
+async def test_get_session_messages(patched_providers):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        # Get a session first
+        resp = await client.get("/api/sessions")
+        sessions = resp.json()["sessions"]
+        assert len(sessions) > 0
+
+        # Get messages for the first session
+        session_id = sessions[0]["id"]
+        resp = await client.get(f"/api/session/{session_id}")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert "messages" in data
+        assert "session_id" in data
+
+
+async def test_get_session_not_found(monkeypatch):
+    monkeypatch.setattr(srv, "get_available_providers", lambda: [])
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/api/session/cursor:nonexistent:fake")
+        assert resp.status_code == 404
+
+
+async def test_index_page(monkeypatch):
+    monkeypatch.setattr(srv, "get_available_providers", lambda: [])
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/")
+        assert resp.status_code == 200
+        assert "aichat-history" in resp.text
 
 
-@pytest.mark.asyncio
 async def test_merged_sessions_all_backends(
-    tmp_cursor_workspace, tmp_cursor_global, tmp_claude_code_dir, tmp_opencode_dir
+    tmp_cursor_workspace, tmp_cursor_global, tmp_claude_code_dir, tmp_opencode_dir, monkeypatch
 ):
     """Test that sessions from all 3 backends are merged correctly."""
-    cursor = CursorProvider()
-    cursor.get_base_path = lambda: tmp_cursor_workspace
+    cursor = CursorProvider(base_path=tmp_cursor_workspace)
     cursor.is_available = lambda: True
 
-    claude = ClaudeCodeProvider()
-    claude.get_base_path = lambda: tmp_claude_code_dir
+    claude = ClaudeCodeProvider(base_path=tmp_claude_code_dir)
     claude.is_available = lambda: True
 
-    opencode = OpenCodeProvider()
-    opencode.get_base_path = lambda: tmp_opencode_dir
+    opencode = OpenCodeProvider(base_path=tmp_opencode_dir)
     opencode.is_available = lambda: True
 
     all_providers = [cursor, claude, opencode]
 
-    with (
-        patch("aichat_history.server.get_available_providers", return_value=all_providers),
-        patch("aichat_history.backends.cursor.get_cursor_global_path", return_value=tmp_cursor_global),
-    ):
+    monkeypatch.setattr(srv, "get_available_providers", lambda: all_providers)
+    monkeypatch.setattr(cursor_backend, "get_cursor_global_path", lambda: tmp_cursor_global)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        # Check sources
+        resp = await client.get("/api/sources")
+        sources = resp.json()
+        assert "cursor" in sources
+        assert "claude_code" in sources
+        assert "opencode" in sources
+
+        # Check merged sessions
+        resp = await client.get("/api/sessions")
+        data = resp.json()
+        session_sources = {s["source"] for s in data["sessions"]}
+        assert "cursor" in session_sources
+        assert "claude_code" in session_sources
+        assert "opencode" in session_sources
+        # 2 cursor workspace + 1 cursor global + 2 claude + 1 opencode = 6
+        assert data["total"] == 6
+
+        # Filter by source
+        resp = await client.get("/api/sessions?source=claude_code")
+        data = resp.json()
+        assert all(s["source"] == "claude_code" for s in data["sessions"])
+        assert data["total"] == 2
+
+
+async def test_session_listing_reused_until_data_changes(
+    cursor_provider, tmp_cursor_workspace, patched_providers
+):
+    with patch.object(cursor_provider, "list_sessions", wraps=cursor_provider.list_sessions) as list_sessions:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            first = (await client.get("/api/sessions")).json()
+            second = (await client.get("/api/sessions?sort=newest")).json()
+            assert list_sessions.call_count == 1
+            assert first["total"] == second["total"] == 3
+
+            db_path = tmp_cursor_workspace / "abc123hash" / "state.vscdb"
+            st = os.stat(db_path)
+            os.utime(db_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+            await client.get("/api/sessions")
+            assert list_sessions.call_count == 2
+
+
+async def test_paginated_sort_matches_full_sort(
+    tmp_cursor_workspace, tmp_cursor_global, tmp_claude_code_dir, tmp_opencode_dir, monkeypatch
+):
+    cursor = CursorProvider(base_path=tmp_cursor_workspace)
+    claude = ClaudeCodeProvider(base_path=tmp_claude_code_dir)
+    opencode = OpenCodeProvider(base_path=tmp_opencode_dir)
+
+    monkeypatch.setattr(srv, "get_available_providers", lambda: [cursor, claude, opencode])
+    monkeypatch.setattr(cursor_backend, "get_cursor_global_path", lambda: tmp_cursor_global)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        for sort in ("newest", "messages", "project"):
+            full = (await client.get(f"/api/sessions?sort={sort}")).json()
+            page = (await client.get(f"/api/sessions?sort={sort}&offset=1&limit=2")).json()
+            assert page["total"] == full["total"] == 6
+            assert [s["id"] for s in page["sessions"]] == [s["id"] for s in full["sessions"][1:3]]
+
+
+def test_safe_title_table_matches_isalnum_filter():
+    title = 'Fix "auth" bug: café/naïve 数据 -_ v2.0 <script>\t✓'
+    expected = "".join(c if c.isalnum() or c in "-_ " else "" for c in title)
+    table = srv._SafeTitleTable()
+    # The first pass fills the table through __missing__; the second is
+    # served entirely from the cached entries.
+    assert title.translate(table) == expected
+    assert title.translate(table) == expected
+
+
+async def test_conditional_requests_return_304_until_data_changes(
+    tmp_cursor_workspace, patched_providers
+):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/api/sessions")
+        etag = resp.headers["etag"]
+        assert resp.headers["cache-control"] == "no-cache"
+        session_id = "cursor:abc123hash:comp-uuid-001"
+
+        resp = await client.get("/api/sessions", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.content == b""
+        # A different query is a different representation
+        resp = await client.get("/api/sessions?sort=newest", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+
+        resp = await client.get(f"/api/session/{session_id}")
+        session_etag = resp.headers["etag"]
+        resp = await client.get(f"/api/session/{session_id}", headers={"If-None-Match": session_etag})
+        assert resp.status_code == 304
+
+        db_path = tmp_cursor_workspace / "abc123hash" / "state.vscdb"
+        st = os.stat(db_path)
+        os.utime(db_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        resp = await client.get("/api/sessions", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["etag"] != etag
+        resp = await client.get(f"/api/session/{session_id}", headers={"If-None-Match": session_etag})
+        assert resp.status_code == 200
+
+
+async def test_session_etag_ignores_unrelated_sessions(tmp_opencode_dir, monkeypatch):
+    provider = OpenCodeProvider(base_path=tmp_opencode_dir)
+    provider.is_available = lambda: True
+
+    monkeypatch.setattr(srv, "get_available_providers", lambda: [provider])
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/api/session/opencode:ses_001")
+        etag = resp.headers["etag"]
+        before = provider.data_version()
+
+        other = tmp_opencode_dir / "message" / "ses_002"
+        other.mkdir()
+        (other / "msg_900.json").write_text('{"id": "msg_900"}', encoding="utf-8")
+        message_dir = other.parent
+        st = os.stat(message_dir)
+        os.utime(message_dir, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        assert provider.data_version() != before
+
+        resp = await client.get("/api/session/opencode:ses_001", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+
+async def test_export_etag_changes_when_jsonl_grows(tmp_claude_code_dir, tmp_path, monkeypatch):
+    projects = tmp_path / "projects"
+    shutil.copytree(tmp_claude_code_dir, projects)
+    provider = ClaudeCodeProvider(base_path=projects)
+    monkeypatch.setattr(srv, "get_available_providers", lambda: [provider])
+
+    session_id = "claude:-Users-testuser-dev-myapp:session-001"
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get(f"/api/export/{session_id}?format=md")
+        etag = resp.headers["etag"]
+        before = provider.data_version()
+
+        # The project has an index, so appending a message leaves the
+        # listing version untouched
+        jsonl = projects / "-Users-testuser-dev-myapp" / "session-001.jsonl"
+        with jsonl.open("a", encoding="utf-8") as f:
+            f.write('\n{"type": "user", "message": {"role": "user", "content": "Appended prompt"}}')
+        assert provider.data_version() == before
+
+        resp = await client.get(f"/api/export/{session_id}?format=md", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["etag"] != etag
+        assert "Appended prompt" in resp.text
+
+
+async def test_export_etag_changes_when_part_file_changes(tmp_opencode_dir, monkeypatch):
+    provider = OpenCodeProvider(base_path=tmp_opencode_dir)
+    monkeypatch.setattr(srv, "get_available_providers", lambda: [provider])
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/api/export/opencode:ses_001?format=json")
+        etag = resp.headers["etag"]
+
+        part = tmp_opencode_dir / "part" / "msg_002" / "prt_001.json"
+        part.write_text('{"type": "text", "text": "Rewritten answer"}', encoding="utf-8")
+        st = os.stat(part)
+        os.utime(part, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+        resp = await client.get("/api/export/opencode:ses_001?format=json", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert "Rewritten answer" in resp.text
+
+
+async def test_session_messages_match_dict_encoding(cursor_provider, patched_providers):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        session_id = (await client.get("/api/sessions")).json()["sessions"][0]["id"]
+        resp = await client.get(f"/api/session/{session_id}")
+        assert resp.headers["content-type"] == "application/json"
+        expected = [srv._message_to_dict(m) for m in cursor_provider.get_session_messages(session_id)]
+        assert expected
+        assert resp.json()["messages"] == expected
+
+
+async def test_session_messages_reused_until_session_changes(
+    cursor_provider, tmp_cursor_workspace, patched_providers
+):
+    session_id = "cursor:abc123hash:comp-uuid-001"
+    with patch.object(
+        cursor_provider, "get_session_messages", wraps=cursor_provider.get_session_messages
+    ) as get_messages:
         transport = ASGITransport(app=app)
         async with AsyncClient(transport=transport, base_url="http://test") as client:
-            # Check sources
-            resp = await client.get("/api/sources")
-            sources = resp.json()
-            assert "cursor" in sources
-            assert "claude_code" in sources
-            assert "opencode" in sources
-
-            # Check merged sessions
-            resp = await client.get("/api/sessions")
-            data = resp.json()
-            session_sources = {s["source"] for s in data["sessions"]}
-            assert "cursor" in session_sources
-            assert "claude_code" in session_sources
-            assert "opencode" in session_sources
-            # 2 cursor workspace + 1 cursor global + 2 claude + 1 opencode = 6
-            assert data["total"] == 6
-
-            # Filter by source
-            resp = await client.get("/api/sessions?source=claude_code")
-            data = resp.json()
-            assert all(s["source"] == "claude_code" for s in data["sessions"])
-            assert data["total"] == 2
+            first = (await client.get(f"/api/session/{session_id}")).json()
+            export = await client.get(f"/api/export/{session_id}?format=md")
+            assert export.status_code == 200
+            assert get_messages.call_count == 1
+
+            db_path = tmp_cursor_workspace / "abc123hash" / "state.vscdb"
+            st = os.stat(db_path)
+            os.utime(db_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+            second = (await client.get(f"/api/session/{session_id}")).json()
+            assert get_messages.call_count == 2
+            assert second == first
+
+
+def test_listing_search_fields_are_casefolded():
+    listing = srv._Listing.build(None, [Session("s1", "w", "Straße Routing", 1, project_path="/Ω/Proj")])
+    assert listing.folded == [("strasse routing", "/ω/proj")]